@@ -0,0 +1,238 @@
+"""End-to-end latency benchmark against the bundled stand-in chat server (runs offline).
+
+Run from the repository root:
+
+    python benchmarks/llm_latency.py                          # all modes at concurrency 1, 4, 16
+    python benchmarks/llm_latency.py --latency 0.2 --jitter 0.05 --error-rate 0.02
+    python benchmarks/llm_latency.py --json results.json      # save for later comparison
+    python benchmarks/llm_latency.py --baseline results.json  # fail if p95 regresses by more than --tolerance
+    python benchmarks/llm_latency.py --rate-limit             # include the client-side rate limiter
+
+Requests go through LLMEngine exactly as the app sends them (router, token budget, JSON parsing);
+only the network peer is local. The response caches are bypassed and every query is distinct, so every
+request reaches the server.
+Exits non-zero on failed requests or a p95 regression.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ("command", "analyst", "developer")
+
+PROMPTS = {}
+REQUEST_IDS = itertools.count(1)
+CONTEXT = "\n".join(f"[build.log#{i}]\nstep {i}: compiled module_{i}.py with 0 errors, {i % 3} warnings" for i in range(40))
+
+
+def build_prompts():
+    """Queries shaped like the ones TerminalWidget sends (imported after HOME is redirected)"""
+    from src.core.prompts import Prompt, ANALYST_SYSTEM_PROMPT, DEVELOPER_SYSTEM_PROMPT
+    PROMPTS.update({
+        "command": "list files in the current directory",
+        "analyst": Prompt(ANALYST_SYSTEM_PROMPT, "Summarize the build log.", CONTEXT),
+        "developer": Prompt(DEVELOPER_SYSTEM_PROMPT, "Write a function that reads a file into a list of lines.", CONTEXT),
+    })
+
+
+def prompt_for(mode):
+    """PROMPTS[mode] with a unique question, so the coalescer cannot merge concurrent requests"""
+    base = PROMPTS[mode]
+    tag = f" (request {next(REQUEST_IDS)})"
+    if isinstance(base, str):
+        return base + tag
+    # Only the question changes, so the stable prefix still hits the provider prompt cache
+    return type(base)(base.system, base.question + tag, base.context)
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+def is_valid(mode, result):
+    if mode == "analyst":
+        return isinstance(result, (dict, list)) and not (isinstance(result, dict) and "error" in result)
+    if mode == "developer":
+        return isinstance(result, str) and bool(result) and not result.startswith("Error")
+    return bool(getattr(result, "command_shell", ""))
+
+
+async def run_level(engine, mode, concurrency, requests):
+    """Latencies (s) and failure count for `requests` queries with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+    stream = (lambda token: None) if mode != "command" else None
+
+    async def one():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await engine.aprocess_query(prompt_for(mode), mode, use_cache=False,
+                                                     on_token=stream, raise_errors=True)
+            except Exception:
+                failures += 1
+                return
+            if is_valid(mode, result):
+                latencies.append(time.perf_counter() - start)
+            else:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return latencies, failures, time.perf_counter() - start
+
+
+def run_dispatcher(engine, concurrency, requests):
+    """Same measurement through RequestDispatcher (submission to in-order delivery on the Qt thread)"""
+    from PySide6.QtCore import QCoreApplication, QEventLoop
+    from src.core.worker import RequestDispatcher
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    dispatcher = RequestDispatcher(engine)
+    loop = QEventLoop()
+    started = {}
+    latencies = []
+    failures = 0
+    remaining = [requests]
+
+    def submit_next():
+        if remaining[0] > 0 and len(started) < concurrency:
+            remaining[0] -= 1
+            request_id = dispatcher.submit(prompt_for("command"), "command")
+            started[request_id] = time.perf_counter()
+
+    def done(request_id, result=None, ok=True):
+        nonlocal failures
+        elapsed = time.perf_counter() - started.pop(request_id)
+        if ok and is_valid("command", result):
+            latencies.append(elapsed)
+        else:
+            failures += 1
+        if remaining[0] == 0 and not started:
+            loop.quit()
+        while remaining[0] > 0 and len(started) < concurrency:
+            submit_next()
+
+    dispatcher.finished.connect(lambda request_id, result: done(request_id, result))
+    dispatcher.error.connect(lambda request_id, message: done(request_id, ok=False))
+
+    start = time.perf_counter()
+    while remaining[0] > 0 and len(started) < concurrency:
+        submit_next()
+    loop.exec()
+    app.processEvents()
+    return latencies, failures, time.perf_counter() - start
+
+
+def compare(rows, baseline_path, tolerance):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["mode"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for row in rows:
+        base = baseline.get((row["mode"], row["concurrency"]))
+        if base and base["p95_ms"] and row["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{row['mode']} x{row['concurrency']}: p95 {row['p95_ms']:.1f} ms "
+                               f"vs baseline {base['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", default=",".join(MODES) + ",dispatcher",
+                        help="Comma-separated modes (dispatcher needs PySide6)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=60, help="Requests per mode and concurrency level")
+    parser.add_argument("--latency", type=float, default=0.05, help="Server delay before the first byte (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="Uniform +/- spread around --latency (s)")
+    parser.add_argument("--token-delay", type=float, default=0.001, help="Delay between streamed chunks (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of injected server errors")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--rate-limit", action="store_true",
+                        help="Keep the client-side rate limiter on (off by default so it does not set the pace)")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file from an earlier run to compare p95 against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 regression vs baseline")
+    args = parser.parse_args(argv)
+
+    # Keep the user's config, caches and history untouched
+    home = tempfile.mkdtemp(prefix="promptshell-bench-")
+    os.environ["HOME"] = os.environ["USERPROFILE"] = home
+
+    from src.core.config import settings, LLMConfig
+    from src.core.llm.fake_server import FakeChatServer
+    from src.core.llm_engine import LLMEngine
+
+    build_prompts()
+    server = FakeChatServer(latency=args.latency, jitter=args.jitter, token_delay=args.token_delay,
+                            error_rate=args.error_rate, seed=args.seed).start()
+    settings.config.llm = LLMConfig(provider="local", model_name="stand-in", base_url=server.url)
+    settings.config.cache.enabled = False
+    settings.config.memory.enabled = False  # every request measures the same prompt
+    settings.config.intents.enabled = False  # the local rules would answer the command query without the server
+    settings.config.rate_limit.enabled = args.rate_limit  # the default 60 rpm would cap every level at 1 req/s
+    engine = LLMEngine()
+
+    modes = [m for m in args.modes.split(",") if m]
+    if "dispatcher" in modes:
+        try:
+            import PySide6  # noqa: F401
+        except ImportError:
+            print("Skipping dispatcher mode: PySide6 is not installed", file=sys.stderr)
+            modes.remove("dispatcher")
+
+    rows = []
+    print(f"{'mode':<10} {'conc':>5} {'ok':>5} {'fail':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    try:
+        for mode in modes:
+            for concurrency in (int(c) for c in args.concurrency.split(",")):
+                if mode == "dispatcher":
+                    latencies, failures, elapsed = run_dispatcher(engine, concurrency, args.requests)
+                else:
+                    latencies, failures, elapsed = engine.runner.run(
+                        run_level(engine, mode, concurrency, args.requests))
+                row = {
+                    "mode": mode, "concurrency": concurrency, "ok": len(latencies), "failed": failures,
+                    "p50_ms": percentile(latencies, 0.50) * 1000,
+                    "p95_ms": percentile(latencies, 0.95) * 1000,
+                    "p99_ms": percentile(latencies, 0.99) * 1000,
+                    "throughput": args.requests / elapsed if elapsed else 0.0,
+                }
+                rows.append(row)
+                print(f"{mode:<10} {concurrency:>5} {row['ok']:>5} {failures:>5} {row['p50_ms']:>8.1f} "
+                      f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['throughput']:>8.1f}")
+    finally:
+        engine.runner.shutdown()
+        server.stop()
+
+    prompt_cache = engine.prompt_cache.stats()
+    print(f"provider prompt cache: {prompt_cache['cached_tokens']:,} of {prompt_cache['prompt_tokens']:,} "
+          f"prompt tokens reused ({prompt_cache['hit_rate']:.0%})")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"server": vars(args), "results": rows}, f, indent=2)
+
+    failures = []
+    if args.error_rate == 0 and any(row["failed"] for row in rows):
+        failures.append("requests failed against a server with no injected errors")
+    if args.baseline:
+        failures += compare(rows, args.baseline, args.tolerance)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Microbenchmark for the shell risk classifier (runs offline, no configuration needed).
+
+Run from the repository root:
+
+    python benchmarks/risk.py              # timings plus the verdict regression table
+    python benchmarks/risk.py --json out.json
+
+Measures a cold classification (every line new to the cache), a cached one, and a simulated
+typing session where the risk hint is re-evaluated after every keystroke. The old substring
+check is timed alongside for comparison. Exits non-zero if a budget is exceeded or a verdict
+in EXPECTED changes.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.core.risk import classify  # noqa: E402
+
+# Microseconds per call (median)
+BUDGETS_US = {
+    "cold": 50.0,
+    "cached": 2.0,
+    "keystroke": 50.0,
+}
+
+CORPUS = [
+    "ls -la",
+    "git status && git diff --stat",
+    "find . -name '*.py' | xargs grep -n TODO",
+    "du -sh * | sort -h | tail -n 20",
+    "docker run --rm -it -v $(pwd):/src alpine sh",
+    "tar -czf backup.tgz src/ 2>/dev/null",
+    "sudo apt-get install -y ripgrep",
+    "rm -rf build/ dist/ *.egg-info",
+    "curl -fsSL https://example.com/install.sh | bash",
+    "ps aux | grep python | awk '{print $2}' | xargs kill",
+    "for f in *.log; do gzip \"$f\"; done",
+    "chmod -R 755 public/",
+]
+
+# Verdicts that must not regress (including the two the old substring lists got wrong)
+EXPECTED = {
+    "rm -rf /tmp/x": "risky",
+    "rm -rf /": "dangerous",
+    "curl https://example.com/data.json": "risky",
+    "curl -fsSL https://get.example.sh | sudo sh": "dangerous",
+    "echo $(rm -rf ~)": "dangerous",
+    "bash -c 'dd if=/dev/zero of=/dev/sda'": "dangerous",
+    "grep -rn 'rm -rf /' .": "safe",
+    "ls -la | sort": "safe",
+    "r'm' -rf /": "dangerous",
+    r"r\m -rf /": "dangerous",
+}
+
+LEGACY_PATTERNS = ["rm -rf /", "rm -rf /*", "mkfs", "dd if=", ":(){:|:&};:", "chmod -r 777 /", "wget http",
+                   "curl http", "rm -rf", "rm -r", "sudo rm", "chmod -r", "chown -r", "> /dev/sda", "mv /"]
+
+
+def legacy(command: str) -> bool:
+    lower = command.lower()
+    return any(pattern in lower for pattern in LEGACY_PATTERNS)
+
+
+def per_call_us(fn, items, rounds: int) -> float:
+    """Median over rounds of the mean time per call, in microseconds"""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        samples.append((time.perf_counter() - start) / len(items) * 1e6)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shell risk classifier microbenchmark")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args(argv)
+
+    def cold(command):
+        classify.cache_clear()
+        classify(command)
+
+    prefixes = [command[:i] for command in CORPUS for i in range(1, len(command) + 1)]
+
+    def typing(_):
+        classify.cache_clear()
+        for prefix in prefixes:
+            classify(prefix)
+
+    for command in CORPUS:
+        classify(command)
+    results = {
+        "cold": per_call_us(cold, CORPUS, args.rounds),
+        "cached": per_call_us(classify, CORPUS * 100, args.rounds),
+        "keystroke": per_call_us(typing, [None], args.rounds) / len(prefixes),
+        "legacy": per_call_us(legacy, CORPUS * 100, args.rounds),
+    }
+
+    failed = False
+    print(f"{'case':<12} {'us/call':>9} {'budget':>8}")
+    for name, value in results.items():
+        budget = BUDGETS_US.get(name)
+        over = budget is not None and value > budget
+        failed |= over
+        print(f"{name:<12} {value:9.2f} {budget if budget is not None else '-':>8}{'  OVER' if over else ''}")
+
+    print()
+    verdicts = {}
+    for command, want in EXPECTED.items():
+        got = classify(command).level
+        verdicts[command] = got
+        wrong = got != want
+        failed |= wrong
+        print(f"{got:<10} {command}{f'  (expected {want})' if wrong else ''}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"us_per_call": results, "verdicts": verdicts}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
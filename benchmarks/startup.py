@@ -0,0 +1,125 @@
+"""Import-time and startup regression benchmark.
+
+Run from the repository root:
+
+    python benchmarks/startup.py          # core modules only (no display needed)
+    python benchmarks/startup.py --gui    # also time launch to first interactive frame
+
+Exits non-zero when a module exceeds its budget or eagerly imports a heavy dependency.
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets in milliseconds
+BUDGETS_MS = {
+    "src.core.executor": 25,
+    "src.core.cache": 25,
+    "src.core.retrieval": 25,
+    "src.cli": 80,
+    "src.core.llm_engine": 400,
+}
+
+# Must not be imported until first use
+HEAVY_MODULES = [
+    "langchain_core", "langchain_openai", "langchain_groq", "langchain_google_genai",
+    "httpx", "numpy", "cv2", "pytesseract", "pdfminer", "PIL", "PySide6",
+]
+
+GUI_BUDGET_MS = 2500
+
+PROBE = """
+import json, sys
+import {module}
+from src.core import config
+print(json.dumps({{
+    "heavy": sorted(m for m in {heavy!r} if m in sys.modules),
+    "settings_loaded": config._LazySettings._instance is not None,
+}}))
+"""
+
+FIRST_FRAME_PROBE = """
+import time
+start = time.perf_counter()
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication
+from src.ui.main_window import PromptShellWindow
+app = QApplication([])
+window = PromptShellWindow()
+window.show()
+def done():
+    print((time.perf_counter() - start) * 1000)
+    app.quit()
+QTimer.singleShot(0, done)
+app.exec()
+"""
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\s*)(\S+)")
+
+
+def measure_import(module: str, repeat: int):
+    """Best-of-N cumulative import time (ms) plus eager-import findings"""
+    best = None
+    probe = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+        for match in IMPORTTIME_RE.finditer(proc.stderr):
+            if match.group(4) == module:
+                ms = int(match.group(2)) / 1000
+                best = ms if best is None else min(best, ms)
+        probe = json.loads(proc.stdout.strip().splitlines()[-1])
+    return best or 0.0, probe
+
+
+def measure_first_frame(repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", FIRST_FRAME_PROBE], cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"GUI startup failed:\n{proc.stderr[-2000:]}")
+        timings.append(float(proc.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument("--gui", action="store_true", help="Also measure launch to first frame")
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{'module':<24} {'import ms':>10} {'budget':>8}  eager heavy imports")
+    for module, budget in BUDGETS_MS.items():
+        ms, probe = measure_import(module, args.repeat)
+        heavy = probe["heavy"]
+        print(f"{module:<24} {ms:>10.1f} {budget:>8}  {', '.join(heavy) or '-'}")
+        if ms > budget:
+            failures.append(f"{module} took {ms:.1f} ms (budget {budget} ms)")
+        if heavy:
+            failures.append(f"{module} eagerly imports {', '.join(heavy)}")
+        if probe["settings_loaded"]:
+            failures.append(f"{module} loads the config file at import time")
+
+    if args.gui:
+        ms = measure_first_frame(args.repeat)
+        print(f"{'first interactive frame':<24} {ms:>10.1f} {GUI_BUDGET_MS:>8}")
+        if ms > GUI_BUDGET_MS:
+            failures.append(f"first frame took {ms:.1f} ms (budget {GUI_BUDGET_MS} ms)")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+# Renders a command response with a multi-step plan through the real slot (needs PySide6/qfluentwidgets)
+from types import SimpleNamespace
+
+from src.core.llm_engine import CommandResponse, PlanStep
+from src.ui.main_window import PromptShellWindow
+
+output = []
+window = SimpleNamespace(
+    terminal_interface=SimpleNamespace(end_stream=lambda: None, append_output=output.append),
+    format_html_table=lambda data: "",
+)
+response = CommandResponse(
+    command_nlp="build then test",
+    command_shell="make && make test",
+    explanation="Builds <all> targets, then runs the tests",
+    is_safe=False,  # keeps the slot from starting the commands
+    plan=[PlanStep(id="build", command="make"), PlanStep(id="test", command="make test", depends_on=["build"])],
+)
+PromptShellWindow.on_command_generated(window, 1, response)
+rendered = "".join(output)
+assert "PLAN:" in rendered and "(after build)" in rendered and "make test" in rendered, rendered
+print("Plan rendered:", rendered)
@@ -0,0 +1,220 @@
+"""Headless batch translation: JSONL natural-language requests in, JSONL results out.
+
+Usage:
+    python -m src.cli requests.jsonl -o results.jsonl --concurrency 8 --rate 5
+
+Each input line is either a JSON object ({"id": ..., "query": ..., "task_type": "command"})
+or a bare JSON string. This module must not import PySide6.
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional, TextIO
+
+
+class RateLimiter:
+    """Spaces request starts to at most `rate` per second"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class InvalidRequest(ValueError):
+    """An input line that is not a usable request; request_id is its id (or line number)"""
+
+    def __init__(self, request_id: Any, message: str):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def parse_line(line: str, line_no: int) -> Optional[Dict[str, Any]]:
+    """Turn one input line into a request dict, or None for blank lines; raises InvalidRequest"""
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        item = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise InvalidRequest(line_no, f"Invalid JSON: {e}")
+    if isinstance(item, str):
+        item = {"query": item}
+    if not isinstance(item, dict):
+        raise InvalidRequest(line_no, f"Expected a JSON object or string, got {type(item).__name__}")
+    item.setdefault("id", line_no)
+    if not isinstance(item.get("query"), str):
+        raise InvalidRequest(item["id"], "Missing or non-string \"query\"")
+    item.setdefault("task_type", "command")
+    return item
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+class BatchRunner:
+    """Runs requests through LLMEngine with bounded concurrency, rate limiting and retries"""
+
+    def __init__(self, engine, executor, concurrency: int = 4, rate: float = 0.0,
+                 retries: int = 2, backoff: float = 1.0, use_cache: bool = True):
+        self.engine = engine
+        self.executor = executor
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.use_cache = use_cache
+        self.latencies: List[float] = []
+        self.ok = 0
+        self.failed = 0
+
+    async def run(self, source: TextIO, sink: TextIO):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.ensure_future(self._worker(queue, sink)) for _ in range(self.concurrency)]
+
+        loop = asyncio.get_running_loop()
+        line_no = 0
+        while True:
+            # Read off the event loop so slow stdin producers don't stall in-flight requests
+            line = await loop.run_in_executor(None, source.readline)
+            if not line:
+                break
+            line_no += 1
+            try:
+                item = parse_line(line, line_no)
+            except InvalidRequest as e:
+                self._write(sink, {"id": e.request_id, "error": str(e)})
+                self.failed += 1
+                continue
+            if item is not None:
+                await queue.put(item)
+
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    async def _worker(self, queue: asyncio.Queue, sink: TextIO):
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            self._write(sink, await self._process(item))
+
+    async def _process(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        record = {"id": item["id"], "query": item["query"], "task_type": item["task_type"]}
+        start = time.monotonic()
+        for attempt in range(self.retries + 1):
+            await self.limiter.wait()
+            try:
+                result = await self.engine.aprocess_query(
+                    item["query"], item["task_type"], use_cache=self.use_cache, raise_errors=True)
+                break
+            except Exception as e:
+                record["error"] = str(e)
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+        else:
+            self.failed += 1
+            record.update(attempts=self.retries + 1, latency=round(time.monotonic() - start, 4))
+            return record
+
+        latency = time.monotonic() - start
+        self.latencies.append(latency)
+        self.ok += 1
+        record.pop("error", None)
+        record.update(attempts=attempt + 1, latency=round(latency, 4))
+
+        if hasattr(result, "command_shell"):
+            record["result"] = result.dict()
+            record["risk_level"] = self.executor.get_risk_level(result.command_shell)
+            if result.plan:
+                record["plan_risk"] = {step.id: self.executor.get_risk_level(step.command) for step in result.plan}
+        else:
+            record["result"] = result
+        return record
+
+    @staticmethod
+    def _write(sink: TextIO, record: Dict[str, Any]):
+        sink.write(json.dumps(record) + "\n")
+        sink.flush()
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        total = self.ok + self.failed
+        return {
+            "total": total,
+            "ok": self.ok,
+            "failed": self.failed,
+            "elapsed": round(elapsed, 3),
+            "throughput_per_s": round(total / elapsed, 3) if elapsed else 0.0,
+            "p50": round(percentile(self.latencies, 0.50), 4),
+            "p95": round(percentile(self.latencies, 0.95), 4),
+            "p99": round(percentile(self.latencies, 0.99), 4),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Translate natural-language requests in bulk (headless).")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL input file (default: stdin)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file (default: stdout)")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="Maximum in-flight requests")
+    parser.add_argument("-r", "--rate", type=float, default=0.0, help="Maximum request starts per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=None,
+                        help="Retries per request on any error; replaces the scheduler's retries of transient errors "
+                             "(default: leave retrying to the scheduler, or 2 if its max_retries is 0)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response caches")
+    args = parser.parse_args(argv)
+
+    # Imported here so --help works without the LLM stack installed
+    from src.core.config import settings
+    from src.core.llm_engine import LLMEngine
+    from src.core.executor import CommandExecutor
+
+    # Batch requests are independent; carrying history between them would mix them up
+    settings.config.memory.enabled = False
+    # One retry layer only: stacked on the rate limiter's retries the attempts would multiply
+    retries = args.retries
+    rate_limit = settings.config.rate_limit
+    if retries is None:
+        retries = 0 if rate_limit.max_retries > 0 else 2
+    elif retries > 0:
+        rate_limit.max_retries = 0
+    engine = LLMEngine()
+    runner = BatchRunner(engine, CommandExecutor(), args.concurrency, args.rate, retries,
+                         use_cache=not args.no_cache)
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.monotonic()
+    try:
+        engine.runner.run(runner.run(source, sink))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+        engine.runner.shutdown()
+
+    summary = runner.summary(time.monotonic() - start)
+    print(json.dumps(summary), file=sys.stderr)
+    return 0 if runner.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
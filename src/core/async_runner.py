@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Dict, List, Optional
+
+
+class AsyncRunner:
+    """Runs coroutines on one dedicated event-loop thread"""
+
+    def __init__(self, name: str = "promptshell-llm"):
+        self.loop = asyncio.new_event_loop()
+        self.futures: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+        # Let streamed responses that were dropped mid-iteration close their connections
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+
+    def submit(self, request_id: Any, coro: Awaitable, timeout: Optional[float] = None) -> Future:
+        """Schedule coro on the loop and track it under request_id"""
+        if timeout:
+            coro = asyncio.wait_for(coro, timeout)
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        with self._lock:
+            self.futures[request_id] = future
+        future.add_done_callback(lambda done: self._forget(request_id, done))
+        return future
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """Block the calling thread until coro completes on the loop"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("AsyncRunner.run() cannot be called from the event-loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+    def _forget(self, request_id: Any, future: Future):
+        # Ids can be reused ("prefetch", "warm-up"); don't drop a newer request's future
+        with self._lock:
+            if self.futures.get(request_id) is future:
+                del self.futures[request_id]
+
+    def cancel(self, request_id: Any) -> bool:
+        """Cancel an in-flight request; returns False if it already finished"""
+        with self._lock:
+            future = self.futures.get(request_id)
+        return future.cancel() if future else False
+
+    def cancel_all(self):
+        """Cancel every in-flight request"""
+        for request_id in self.in_flight():
+            self.cancel(request_id)
+
+    def in_flight(self) -> List[Any]:
+        """Get ids of requests that have not completed"""
+        with self._lock:
+            return list(self.futures.keys())
+
+    def shutdown(self, timeout: float = 5.0):
+        """Cancel outstanding work and stop the loop thread"""
+        if not self._thread.is_alive():
+            return
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
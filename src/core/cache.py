@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+
+class ResponseCache:
+    """Persistent LRU cache for natural-language to shell command translations"""
+
+    def __init__(self, filepath: str, max_entries: int = 500,
+                 ttl_seconds: int = 7 * 24 * 3600, max_bytes: int = 2 * 1024 * 1024):
+        self.filepath = filepath
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._size = 0
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = self.load_entries()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize query text so trivial differences share a cache slot
+
+        Case is kept: file names and literals are case-sensitive, and a hit may be auto-executed.
+        """
+        return " ".join(text.split()).rstrip(" .?!")
+
+    def make_key(self, query: str, system: str, provider: str, model: str) -> str:
+        """Build a cache key from the normalized query and its execution context"""
+        raw = json.dumps([self.normalize(query), system, provider.lower(), model])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def load_entries(self) -> "OrderedDict[str, Dict[str, Any]]":
+        """Load cache entries from file, dropping expired ones"""
+        entries = OrderedDict()
+        if os.path.exists(self.filepath):
+            try:
+                with open(self.filepath, 'r') as f:
+                    data = json.load(f)
+                now = time.time()
+                for key, entry in data.items():
+                    if now - entry.get("created", 0) <= self.ttl_seconds:
+                        entry["size"] = len(json.dumps(entry["value"]))
+                        entries[key] = entry
+                        self._size += entry["size"]
+            except Exception as e:
+                print(f"Error loading response cache: {e}")
+                return OrderedDict()
+        return entries
+
+    def save_entries(self):
+        """Save cache entries to file atomically"""
+        try:
+            data = {k: {"value": v["value"], "created": v["created"]} for k, v in self.entries.items()}
+            tmp_path = f"{self.filepath}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.filepath)
+        except Exception as e:
+            print(f"Error saving response cache: {e}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for key, or None on miss/expiry"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if time.time() - entry["created"] > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry["value"]
+
+    def peek(self, key: str) -> bool:
+        """Whether key has a live entry, without counting a hit or miss or refreshing its recency"""
+        with self._lock:
+            entry = self.entries.get(key)
+            return entry is not None and time.time() - entry["created"] <= self.ttl_seconds
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store value under key, evicting least recently used entries over limits"""
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = {"value": value, "created": time.time(), "size": size}
+            self._size += size
+
+            while self.entries and (len(self.entries) > self.max_entries or self._size > self.max_bytes):
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+            self.save_entries()
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self._size -= entry["size"]
+
+    def clear(self):
+        """Purge all cached entries"""
+        with self._lock:
+            self.entries.clear()
+            self._size = 0
+            self.save_entries()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,7 +1,7 @@
 import os
 import json
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 
 class LLMConfig(BaseModel):
@@ -9,10 +9,113 @@ class LLMConfig(BaseModel):
     model_name: str = "openai/gpt-oss-120b"
     api_key: str = ""
     temperature: float = 0.1
+    streaming: bool = True
+    request_timeout: float = 120.0
+    base_url: Optional[str] = None  # endpoint override, e.g. for the "local" stand-in server
+
+class HedgingConfig(BaseModel):
+    enabled: bool = False
+    secondary: Optional[LLMConfig] = None
+    delay_percentile: float = 0.95
+    initial_delay: float = 2.0
+    min_delay: float = 0.3
+    max_delay: float = 10.0
+
+class RoutingConfig(BaseModel):
+    enabled: bool = False
+    providers: List[LLMConfig] = Field(default_factory=list)  # fallbacks tried after the primary
+    failure_threshold: int = 3
+    cooldown: float = 30.0
+    window: int = 20
+    min_samples: int = 5
+    max_error_rate: float = 0.5
+    latency_alpha: float = 0.3
+
+class CacheConfig(BaseModel):
+    enabled: bool = True
+    ttl_seconds: int = 7 * 24 * 3600
+    max_entries: int = 500
+    max_bytes: int = 2 * 1024 * 1024
+    semantic: bool = True
+    semantic_threshold: float = 0.82
+
+class HttpConfig(BaseModel):
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 120.0
+    warm_up: bool = True
+
+class RetrievalConfig(BaseModel):
+    enabled: bool = True
+    chunk_size: int = 1200
+    chunk_overlap: int = 200
+    top_k: int = 6
+    min_context_chars: int = 8000  # smaller uploads are sent whole
+
+class BudgetConfig(BaseModel):
+    enabled: bool = True
+    on_overflow: str = "trim"  # "trim" or "reject"
+    max_prompt_tokens: Optional[int] = None  # optional cap below the model's context window
+
+class PrefetchConfig(BaseModel):
+    enabled: bool = False  # opt-in: speculative requests are billed even when never submitted
+    debounce_ms: int = 600
+    min_chars: int = 8
+    max_per_minute: int = 6
+
+class IntentConfig(BaseModel):
+    enabled: bool = True  # answer common requests from local rules without an LLM call
+    rules_file: str = "intents.json"  # user rules, relative to the config directory
+
+class RateLimitConfig(BaseModel):
+    enabled: bool = True
+    requests_per_minute: int = 60
+    tokens_per_minute: int = 200000  # estimated prompt tokens
+    overrides: Dict[str, Dict[str, int]] = Field(default_factory=dict)  # provider name -> limits above
+    max_retries: int = 3  # on 429, 408, 5xx and connection errors; replaces the SDKs' own retries
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+
+class TaskConfig(BaseModel):
+    default_workers: int = 2
+    workers: Dict[str, int] = Field(default_factory=lambda: {"media": 1, "exec": 4})  # threads per named queue
+    shutdown_timeout: float = 3.0
+
+class MemoryConfig(BaseModel):
+    enabled: bool = True  # send recent turns and a running summary with each request
+    recent_turns: int = 4  # kept verbatim
+    recent_tokens: int = 800
+    summary_tokens: int = 250
+    turn_tokens: int = 200  # per question or answer
+
+class ExecutionConfig(BaseModel):
+    timeout: float = 0.0  # seconds before a running command is stopped; 0 = only the Stop button
+    kill_after: float = 3.0  # grace period between the interrupt and a forced kill
+    persistent_shell: bool = True  # keep cd/exports between commands in named PTY sessions (POSIX)
+    shell: Optional[str] = None  # defaults to bash, else /bin/sh
+    display_chars: int = 200_000  # output shown live per command; the rest is summarized with its tail
+    tail_chars: int = 20_000  # last output kept in memory (shown when a command's output was cut)
+    memory_chars: int = 1_000_000  # beyond this a command's full output spills to a temp file
+    keep_outputs: int = 5  # finished commands whose full output stays browsable with /more
+    plan_workers: int = 0  # plan steps run at once; 0 = one per CPU
+    plan_policy: str = "fail_fast"  # or "continue": a failure only skips the steps that depend on it
+    plan_max_risk: str = "safe"  # steps riskier than this (safe/risky/dangerous) are blocked
 
 class AppConfig(BaseModel):
     theme: str = "dark"
     llm: LLMConfig = Field(default_factory=LLMConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    http: HttpConfig = Field(default_factory=HttpConfig)
+    hedging: HedgingConfig = Field(default_factory=HedgingConfig)
+    routing: RoutingConfig = Field(default_factory=RoutingConfig)
+    retrieval: RetrievalConfig = Field(default_factory=RetrievalConfig)
+    budget: BudgetConfig = Field(default_factory=BudgetConfig)
+    prefetch: PrefetchConfig = Field(default_factory=PrefetchConfig)
+    intents: IntentConfig = Field(default_factory=IntentConfig)
+    rate_limit: RateLimitConfig = Field(default_factory=RateLimitConfig)
+    tasks: TaskConfig = Field(default_factory=TaskConfig)
+    memory: MemoryConfig = Field(default_factory=MemoryConfig)
+    execution: ExecutionConfig = Field(default_factory=ExecutionConfig)
     history_limit: int = 1000
 
 class ConfigManager:
@@ -60,6 +163,16 @@ class ConfigManager:
         self.config.theme = theme
         self.save_config()
             
+    def set_cache_enabled(self, enabled: bool):
+        """Enable or bypass the response cache"""
+        self.config.cache.enabled = enabled
+        self.save_config()
+            
+    def set_prefetch_enabled(self, enabled: bool):
+        """Enable or disable speculative translation while typing"""
+        self.config.prefetch.enabled = enabled
+        self.save_config()
+            
     def update_llm_config(self, provider: str, model: str, api_key: str):
         self.config.llm.provider = provider
         self.config.llm.model_name = model
@@ -67,5 +180,20 @@ class ConfigManager:
             self.config.llm.api_key = api_key
         self.save_config()
 
+class _LazySettings:
+    """Creates the ConfigManager on first attribute access so importing config does no disk I/O"""
+    _instance: Optional[ConfigManager] = None
+
+    def _get(self) -> ConfigManager:
+        if _LazySettings._instance is None:
+            _LazySettings._instance = ConfigManager()
+        return _LazySettings._instance
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self._get(), name, value)
+
 # Global config instance
-settings = ConfigManager()
+settings = _LazySettings()
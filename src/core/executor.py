@@ -1,102 +1,69 @@
 import os
+import time
+import codecs
+import signal
+import tempfile
+import threading
 import subprocess
-from typing import Tuple, List
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Optional, Tuple, List
+
+from src.core.risk import RISK_ORDER, classify
+
+PLAN_FAIL_FAST = "fail_fast"  # first failure stops the running steps and skips the rest
+PLAN_CONTINUE = "continue"  # only steps that depend on a failure are skipped
 
 
 class CommandExecutor:
     """Executes shell commands with safety checks"""
     
-    # Dangerous command patterns
-    DANGEROUS_PATTERNS = [
-        'rm -rf /',
-        'rm -rf /*',
-        'mkfs',
-        'dd if=',
-        ':(){:|:&};:',  # Fork bomb
-        'chmod -R 777 /',
-        'wget http',  # Potentially dangerous downloads
-        'curl http',
-    ]
-    
-    # Moderately risky patterns
-    RISKY_PATTERNS = [
-        'rm -rf',
-        'rm -r',
-        'sudo rm',
-        'chmod -R',
-        'chown -R',
-        '> /dev/sda',
-        'mv /',
-    ]
-    
+    # execute() keeps at most this much of each stream (the end of it)
+    MAX_CAPTURE = 1_000_000
+
     def __init__(self):
         self.last_output = ""
         self.last_error = ""
     
     def is_dangerous(self, command: str) -> bool:
         """Check if command is dangerous"""
-        cmd_lower = command.lower()
-        for pattern in self.DANGEROUS_PATTERNS:
-            if pattern.lower() in cmd_lower:
-                return True
-        return False
+        return classify(command).level == "dangerous"
     
     def is_risky(self, command: str) -> bool:
-        """Check if command is risky"""
-        cmd_lower = command.lower()
-        for pattern in self.RISKY_PATTERNS:
-            if pattern.lower() in cmd_lower:
-                return True
-        return False
+        """Check if command is risky (or worse)"""
+        return classify(command).level != "safe"
     
     def is_safe(self, command: str) -> bool:
         """Check if command is safe to execute"""
-        return not (self.is_dangerous(command) or self.is_risky(command))
+        return classify(command).level == "safe"
     
     def get_risk_level(self, command: str) -> str:
         """Get risk level: safe, risky, or dangerous"""
-        if self.is_dangerous(command):
-            return "dangerous"
-        elif self.is_risky(command):
-            return "risky"
-        return "safe"
+        return classify(command).level
     
     def get_risk_explanation(self, command: str) -> str:
         """Get explanation of why command is risky"""
-        cmd_lower = command.lower()
-        
-        if 'rm -rf /' in cmd_lower:
-            return "This command will delete all files on your system!"
-        elif 'rm -rf' in cmd_lower or 'rm -r' in cmd_lower:
-            return "This command will recursively delete files. Make sure you specify the correct path."
-        elif 'chmod -R 777' in cmd_lower:
-            return "This command will make all files world-writable, which is a security risk."
-        elif 'sudo' in cmd_lower:
-            return "This command runs with administrator privileges. Verify it's correct."
-        elif 'dd if=' in cmd_lower:
-            return "This command can overwrite disk data. Double-check the parameters."
-        elif 'mkfs' in cmd_lower:
-            return "This command will format a disk, destroying all data on it."
-        
-        return "This command may have unintended consequences. Review carefully."
+        return classify(command).reason or "This command may have unintended consequences. Review carefully."
     
     def execute(self, command: str, cwd: str = None) -> Tuple[str, str]:
-        """Execute a shell command and return (stdout, stderr)"""
+        """Execute a shell command and return (stdout, stderr), each cut to its last MAX_CAPTURE bytes"""
         try:
-            # Use shell=True to support pipes, redirects, etc.
-            result = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                cwd=cwd or os.getcwd(),
-                timeout=30  # 30 second timeout
-            )
+            # Streams go to temp files, not pipes held in memory, so huge output stays on disk
+            with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+                # Use shell=True to support pipes, redirects, etc.
+                subprocess.run(
+                    command,
+                    shell=True,
+                    stdout=out,
+                    stderr=err,
+                    cwd=cwd or os.getcwd(),
+                    timeout=30  # 30 second timeout
+                )
+                stdout, stderr = self._read_tail(out), self._read_tail(err)
             
-            self.last_output = result.stdout
-            self.last_error = result.stderr
+            self.last_output = stdout
+            self.last_error = stderr
             
-            return result.stdout, result.stderr
+            return stdout, stderr
             
         except subprocess.TimeoutExpired:
             error = "Command timed out after 30 seconds"
@@ -107,6 +74,24 @@ class CommandExecutor:
             self.last_error = error
             return "", error
     
+    def _read_tail(self, f) -> str:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - self.MAX_CAPTURE))
+        data = f.read()
+        if b"\x00" in data[:4096]:
+            return f"[binary output, {size:,} bytes]"
+        text = data.decode("utf-8", errors="replace")
+        if size > self.MAX_CAPTURE:
+            text = f"[... first {size - self.MAX_CAPTURE:,} bytes omitted ...]\n" + text
+        return text
+    
+    def execute_plan(self, steps, cwd: str = None, policy: str = PLAN_FAIL_FAST, max_workers: int = 0,
+                     max_risk: str = "safe", on_output: Optional[Callable[[str], None]] = None) -> List["StepResult"]:
+        """Run plan steps (objects with id, command and depends_on) as a DAG; returns one result per step"""
+        run = PlanRun(steps, self, cwd, on_output, policy, max_workers, max_risk)
+        run.run()
+        return run.results
+    
     def get_command_preview(self, command: str) -> dict:
         """Get detailed preview of what command will do"""
         parts = command.split()
@@ -140,3 +125,282 @@ class CommandExecutor:
             "full_command": command,
             "risk_level": self.get_risk_level(command)
         }
+
+
+class CommandProcess:
+    """A shell command run with Popen whose output (stdout and stderr interleaved) is streamed as it arrives.
+
+    run() blocks until the process exits and is meant for a background worker; stop() may be called
+    from any thread: it interrupts the whole process group, then kills it after kill_after seconds.
+    """
+
+    def __init__(self, command: str, cwd: str = None, on_output: Optional[Callable[[str], None]] = None,
+                 timeout: float = 0.0, kill_after: float = 3.0):
+        self.command = command
+        self.cwd = cwd or os.getcwd()
+        self.on_output = on_output
+        self.timeout = timeout
+        self.kill_after = kill_after
+        self.process: Optional[subprocess.Popen] = None
+        self.returncode: Optional[int] = None
+        self.elapsed = 0.0
+        self.stopped = False
+        self.timed_out = False
+        self._lock = threading.Lock()
+
+    def run(self) -> int:
+        """Start the command, stream its output and return the exit code"""
+        start = time.monotonic()
+        with self._lock:
+            if self.stopped:
+                return -1
+            self.process = subprocess.Popen(
+                self.command,
+                shell=True,
+                cwd=self.cwd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                bufsize=0,
+                # Own process group, so Stop reaches pipelines and children too
+                start_new_session=os.name != "nt",
+                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP if os.name == "nt" else 0
+            )
+        timer = None
+        if self.timeout:
+            timer = threading.Timer(self.timeout, self._expire)
+            timer.daemon = True
+            timer.start()
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        fd = self.process.stdout.fileno()
+        try:
+            while True:
+                data = os.read(fd, 65536)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text and self.on_output is not None:
+                    self.on_output(text)
+            tail = decoder.decode(b"", final=True)
+            if tail and self.on_output is not None:
+                self.on_output(tail)
+            self.returncode = self.process.wait()
+        finally:
+            self.process.stdout.close()
+            if timer is not None:
+                timer.cancel()
+            self.elapsed = time.monotonic() - start
+        return self.returncode
+
+    def _expire(self):
+        self.timed_out = True
+        self.stop()
+
+    def stop(self):
+        """Interrupt the command (SIGINT / CTRL_BREAK), escalating to a kill if it keeps running"""
+        with self._lock:
+            self.stopped = True
+            if self.process is None or self.process.poll() is not None:
+                return
+            self._signal(signal.CTRL_BREAK_EVENT if os.name == "nt" else signal.SIGINT)
+        killer = threading.Timer(self.kill_after, self._kill)
+        killer.daemon = True
+        killer.start()
+
+    def _kill(self):
+        if self.process.poll() is None:
+            self._signal(None)
+
+    def _signal(self, sig):
+        try:
+            if os.name == "nt":
+                if sig is None:
+                    self.process.kill()
+                else:
+                    self.process.send_signal(sig)
+            else:
+                os.killpg(self.process.pid, signal.SIGKILL if sig is None else sig)
+        except (ProcessLookupError, PermissionError, OSError):
+            pass
+
+
+def plan_order(steps) -> List[str]:
+    """Step ids in dependency order; raises ValueError on duplicate ids, unknown dependencies or cycles"""
+    deps: Dict[str, List[str]] = {}
+    for step in steps:
+        if step.id in deps:
+            raise ValueError(f"Duplicate plan step '{step.id}'")
+        deps[step.id] = list(step.depends_on)
+    for step_id, needs in deps.items():
+        unknown = [d for d in needs if d not in deps]
+        if unknown:
+            raise ValueError(f"Plan step '{step_id}' depends on unknown step '{unknown[0]}'")
+    order, done = [], set()
+    while len(order) < len(deps):
+        ready = [s for s, needs in deps.items() if s not in done and all(d in done for d in needs)]
+        if not ready:
+            raise ValueError("Plan steps have a dependency cycle")
+        order += ready
+        done.update(ready)
+    return order
+
+
+class StepResult:
+    """Outcome of one plan step: ok, failed, blocked (over the risk limit), skipped or stopped"""
+
+    def __init__(self, step_id: str, command: str, risk: str):
+        self.id = step_id
+        self.command = command
+        self.risk = risk
+        self.status = "pending"
+        self.returncode: Optional[int] = None
+        self.started = 0.0  # seconds after the plan started
+        self.elapsed = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "status": self.status, "returncode": self.returncode, "risk": self.risk,
+                "started": round(self.started, 3), "elapsed": round(self.elapsed, 3)}
+
+
+class PlanRun:
+    """A multi-step plan run as a DAG of CommandProcesses, with the same run()/stop() interface.
+
+    Steps whose dependencies have all succeeded start at once, up to max_workers at a time (default:
+    one per CPU), so independent steps build and test in parallel. Every step is checked with
+    get_risk_level before anything starts: under fail_fast a step above max_risk blocks the whole
+    plan, under continue only that step and its dependents. Output lines are prefixed with the step id.
+    """
+
+    def __init__(self, steps, executor: CommandExecutor, cwd: str = None, on_output: Optional[Callable[[str], None]] = None,
+                 policy: str = PLAN_FAIL_FAST, max_workers: int = 0, max_risk: str = "safe",
+                 timeout: float = 0.0, kill_after: float = 3.0):
+        self.steps = {step.id: step for step in steps}
+        self.order = plan_order(steps)
+        self.cwd = cwd
+        self.on_output = on_output
+        self.policy = policy
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.kill_after = kill_after
+        self.results = [StepResult(step.id, step.command, executor.get_risk_level(step.command)) for step in steps]
+        self._by_id = {result.id: result for result in self.results}
+        self.blocked = [r.id for r in self.results if RISK_ORDER.get(r.risk, 2) > RISK_ORDER.get(max_risk, 0)]
+        self.processes: Dict[str, CommandProcess] = {}
+        self.returncode: Optional[int] = None
+        self.elapsed = 0.0
+        self.stopped = False
+        self.timed_out = False
+        self._halted = False  # fail_fast tripped: start nothing more
+        self._lock = threading.Lock()
+
+    def run(self) -> int:
+        start = time.monotonic()
+        failed = []
+        for step_id in self.blocked:
+            self._by_id[step_id].status = "blocked"
+            self._say(step_id, f"BLOCKED ({self._by_id[step_id].risk}): {self.steps[step_id].command}")
+            failed.append(1)
+        self._halted = bool(self.blocked) and self.policy == PLAN_FAIL_FAST
+
+        running = {}  # future -> step id
+        with ThreadPoolExecutor(self.max_workers, thread_name_prefix="promptshell-plan") as pool:
+            while True:
+                if not self._halted and not self.stopped:
+                    for step_id in self._ready(running.values()):
+                        result = self._by_id[step_id]
+                        result.status = "running"
+                        result.started = time.monotonic() - start
+                        running[pool.submit(self._run_step, step_id)] = step_id
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = self._by_id[running.pop(future)]
+                    try:
+                        result.returncode = future.result()
+                    except Exception as e:
+                        self._say(result.id, f"Execution error: {e}")
+                        result.returncode = -1
+                    process = self.processes.get(result.id)
+                    result.elapsed = process.elapsed if process is not None else 0.0
+                    if process is not None and process.timed_out:
+                        self.timed_out = True
+                    if result.returncode == 0:
+                        result.status = "ok"
+                    else:
+                        result.status = "stopped" if process is None or process.stopped else "failed"
+                        failed.append(result.returncode)
+                        if self.policy == PLAN_FAIL_FAST and not self._halted:
+                            self._halted = True
+                            self._stop_running()
+                    self._say(result.id, f"{result.status.upper()} (exit {result.returncode}) in {result.elapsed:.2f}s")
+
+        for result in self.results:
+            if result.status == "pending":
+                result.status = "skipped"
+        self.elapsed = time.monotonic() - start
+        self.returncode = failed[0] if failed else 0
+        return self.returncode
+
+    def _ready(self, running) -> List[str]:
+        """Pending steps whose dependencies all succeeded; dependents of a failure are marked skipped"""
+        ready = []
+        for step_id in self.order:
+            result = self._by_id[step_id]
+            if result.status != "pending":
+                continue
+            needs = [self._by_id[d].status for d in self.steps[step_id].depends_on]
+            if any(status not in ("pending", "running", "ok") for status in needs):
+                result.status = "skipped"
+                self._say(step_id, "SKIPPED (a dependency did not succeed)")
+            elif all(status == "ok" for status in needs) and len(running) + len(ready) < self.max_workers:
+                ready.append(step_id)
+        return ready
+
+    def _run_step(self, step_id: str) -> int:
+        with self._lock:
+            if self.stopped or self._halted:
+                return -1
+            process = CommandProcess(self.steps[step_id].command, self.cwd, self._prefixer(step_id),
+                                     self.timeout, self.kill_after)
+            self.processes[step_id] = process
+        code = process.run()
+        process.on_output("")  # flush a last line without a newline
+        return code
+
+    def _prefixer(self, step_id: str) -> Callable[[str], None]:
+        """Tag each complete output line with its step, so parallel output stays readable"""
+        partial = []
+
+        def on_output(text: str):
+            if self.on_output is None:
+                return
+            if not text:
+                if partial:
+                    self.on_output(f"[{step_id}] {''.join(partial)}\n")
+                    partial.clear()
+                return
+            lines = ("".join(partial) + text).split("\n")
+            partial[:] = [lines.pop()]
+            if lines:
+                self.on_output("".join(f"[{step_id}] {line}\n" for line in lines))
+            if partial == [""]:
+                partial.clear()
+        return on_output
+
+    def _say(self, step_id: str, message: str):
+        if self.on_output is not None:
+            self.on_output(f"[{step_id}] {message}\n")
+
+    def _stop_running(self):
+        with self._lock:
+            processes = list(self.processes.values())
+        for process in processes:
+            if process.returncode is None:
+                process.stop()
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+        self._stop_running()
@@ -0,0 +1,291 @@
+import re
+import json
+import shlex
+import itertools
+import platform
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.semantic_cache import normalize_terms
+
+# Raw words as typed; slot values are taken from these so paths keep their case and suffixes
+RAW_WORD_RE = re.compile(r"[\w.~/-]+")
+TEMPLATE_ITEM_RE = re.compile(r"\[[^\]]+\]|\([^)]+\)|\{[\w:]+\}|\S+")
+SLOT_RE = re.compile(r"\{(\w+)")
+
+# Only these may be skipped right before a slot; "named My Dir" must not become mkdir Dir
+SLOT_CONNECTORS = frozenset("in of at on for to from into inside the a an".split())
+# A {path} also needs an introduction: a connector ("in", "of"), one of these words right before it
+# ("mkdir build", "called build"), or a value that looks like a path. Otherwise trailing modifiers
+# such as "list files recursively" would become paths.
+PATH_INTRODUCERS = frozenset("in of at on for to from into inside called named ls du mkdir".split())
+# Places the LLM should resolve ("in home" means ~, not ./home)
+AMBIGUOUS_PLACES = frozenset("home root desktop downloads documents trash here everything all".split())
+
+SLOT_PATTERNS = {
+    "path": re.compile(r"[\w.~/-]+"),
+    "name": re.compile(r"[\w.-]+"),
+    "int": re.compile(r"\d+"),
+}
+
+# Templates are matched against normalized terms (stopwords dropped, synonyms collapsed, stemmed),
+# so "list the files", "show files" and "display all files here" all hit "list files [here]".
+# Commands are keyed by platform family; a rule without an entry for this platform is skipped.
+BUILTIN_RULES: List[Dict[str, Any]] = [
+    {"patterns": ["list files [here]", "list all files [here]", "ls"],
+     "posix": "ls -la", "windows": "dir",
+     "explanation": "Lists all files in the current directory, including hidden ones."},
+    {"patterns": ["list files [in] {path}", "ls {path}"],
+     "posix": "ls -la {path}", "windows": "dir {path}",
+     "explanation": "Lists all files in {path}, including hidden ones."},
+    {"patterns": ["current directory", "what is [the] current directory", "where am i", "pwd",
+                  "print working directory", "which directory am i in"],
+     "posix": "pwd", "windows": "cd",
+     "explanation": "Prints the current working directory."},
+    {"patterns": ["git status", "show git status", "what changed in git"],
+     "posix": "git status", "windows": "git status",
+     "explanation": "Shows the working tree status of the git repository."},
+    {"patterns": ["git log", "show git log", "show [recent] commits", "git history"],
+     "posix": "git log --oneline -n 20", "windows": "git log --oneline -n 20",
+     "explanation": "Shows the 20 most recent commits, one per line."},
+    {"patterns": ["git branch", "git branches", "show [git] branches", "which branch am i on", "current branch"],
+     "posix": "git branch", "windows": "git branch",
+     "explanation": "Lists local git branches; the current one is marked with *."},
+    {"patterns": ["git diff", "show git diff", "show [git] changes"],
+     "posix": "git diff", "windows": "git diff",
+     "explanation": "Shows unstaged changes in the working tree."},
+    {"patterns": ["disk usage", "show disk usage", "disk space", "free disk space", "how much disk space [is] [left]", "df"],
+     "posix": "df -h", "windows": "wmic logicaldisk get caption,freespace,size",
+     "explanation": "Shows used and available space on mounted filesystems."},
+    {"patterns": ["disk usage [of] [this] folder", "directory size", "size of [this] directory", "du"],
+     "posix": "du -sh .",
+     "explanation": "Shows the total size of the current directory."},
+    {"patterns": ["disk usage [of] {path}", "size of {path}", "du {path}"],
+     "posix": "du -sh {path}",
+     "explanation": "Shows the total size of {path}."},
+    {"patterns": ["memory usage", "show memory [usage]", "free memory", "how much memory [is] [free]"],
+     "linux": "free -h", "darwin": "vm_stat", "windows": "systeminfo | findstr Memory",
+     "explanation": "Shows used and free memory."},
+    {"patterns": ["list processes", "show running processes", "running processes", "ps"],
+     "posix": "ps aux", "windows": "tasklist",
+     "explanation": "Lists running processes."},
+    {"patterns": ["count files [here]", "how many files [are] [here]", "number of files [here]"],
+     "posix": "ls -1A | wc -l",
+     "explanation": "Counts entries in the current directory."},
+    {"patterns": ["list largest files", "show largest files [here]", "biggest files [here]"],
+     "posix": "ls -lS | head -n 11", "windows": "dir /O-S",
+     "explanation": "Lists files sorted by size, largest first."},
+    {"patterns": ["(make|create) [a] [new] directory [called|named] {path}", "mkdir {path}"],
+     "posix": "mkdir -p {path}", "windows": "mkdir {path}",
+     "explanation": "Creates the directory {path} (and missing parents)."},
+    {"patterns": ["date", "show [the] date", "what time is it", "current time", "what is [the] date"],
+     "posix": "date", "windows": "echo %date% %time%",
+     "explanation": "Prints the current date and time."},
+    {"patterns": ["whoami", "who am i", "current user"],
+     "posix": "whoami", "windows": "whoami",
+     "explanation": "Prints the current user name."},
+    {"patterns": ["uptime", "show uptime", "how long has [the] system been up"],
+     "posix": "uptime",
+     "explanation": "Shows how long the system has been running and its load averages."},
+    {"patterns": ["ip address", "show [my] ip address", "what is my ip [address]"],
+     "linux": "ip -brief address", "darwin": "ifconfig", "windows": "ipconfig",
+     "explanation": "Shows network interfaces and their IP addresses."},
+    {"patterns": ["environment variables", "show environment variables", "env"],
+     "posix": "env", "windows": "set",
+     "explanation": "Lists environment variables."},
+]
+
+
+def _platform_keys() -> Tuple[str, ...]:
+    system = platform.system().lower()
+    if system == "windows":
+        return ("windows",)
+    return (system, "posix")
+
+
+def expand_template(template: str) -> List[List[str]]:
+    """Every normalized term sequence a template accepts ([optional], (alt|ernatives), {slot})"""
+    choices = []
+    for item in TEMPLATE_ITEM_RE.findall(template):
+        if item.startswith("{"):
+            choices.append([[item]])
+        elif item[0] in "[(":
+            options = [[t for word in alt.split() for t in normalize_terms(word)] for alt in item[1:-1].split("|")]
+            choices.append(([[]] if item[0] == "[" else []) + options)
+        else:
+            choices.append([normalize_terms(item)])
+
+    variants = []
+    for combo in itertools.product(*choices):
+        terms = _collapse([t for part in combo for t in part])
+        if terms and terms not in variants:
+            variants.append(terms)
+    return variants
+
+
+def _collapse(terms: List[str]) -> List[str]:
+    """Drop immediate repeats ("running processes" normalizes to proc, proc)"""
+    return [t for i, t in enumerate(terms) if i == 0 or t != terms[i - 1]]
+
+
+class IntentRule:
+    def __init__(self, name: str, command: str, explanation: str):
+        self.name = name
+        self.command = command
+        self.explanation = explanation
+        self.hits = 0
+
+    def render(self, slots: Dict[str, str]) -> Tuple[str, str]:
+        values = {k: _quote(v) for k, v in slots.items()}
+        return self.command.format(**values), self.explanation.format(**slots)
+
+
+def _quote(value: str) -> str:
+    # Keep ~ unquoted so the shell still expands the home directory
+    if value.startswith("~/"):
+        return "~/" + shlex.quote(value[2:])
+    return shlex.quote(value) if platform.system() != "Windows" else f'"{value}"'
+
+
+class _Node:
+    __slots__ = ("children", "slots", "rule")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.slots: List[Tuple[str, str, "_Node"]] = []  # (slot name, slot type, next node)
+        self.rule: Optional[IntentRule] = None
+
+
+class IntentMatcher:
+    """Offline fast path: a trie of normalized request templates mapped to shell commands.
+
+    The whole request must match a template; anything else falls through to the LLM.
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None):
+        self.root = _Node()
+        self.rules: List[IntentRule] = []
+        self.hits = 0
+        self.misses = 0
+        self.add_rules(BUILTIN_RULES if rules is None else rules)
+
+    def add_rules(self, rules: List[Dict[str, Any]]):
+        """Compile rules into the trie; later rules win over earlier ones for the same template"""
+        keys = _platform_keys()
+        for spec in rules:
+            command = next((spec[k] for k in keys if spec.get(k)), spec.get("command"))
+            if not command:
+                continue
+            try:
+                rule = IntentRule(spec["patterns"][0], command, spec.get("explanation", "Matched a local rule."))
+                for pattern in spec["patterns"]:
+                    # Fail here rather than on a user's request if a placeholder has no matching slot
+                    rule.render({name: "x" for name in SLOT_RE.findall(pattern)})
+            except (KeyError, IndexError, ValueError) as e:
+                print(f"Skipping invalid intent rule {spec.get('patterns')}: {e}")
+                continue
+            self.rules.append(rule)
+            for pattern in spec["patterns"]:
+                for terms in expand_template(pattern):
+                    self._insert(terms, rule)
+
+    def load_file(self, path: str):
+        """Add user rules from a JSON list in the same shape as BUILTIN_RULES"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.add_rules(json.load(f))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error loading intent rules from {path}: {e}")
+
+    def _insert(self, terms: List[str], rule: IntentRule):
+        node = self.root
+        for term in terms:
+            if term.startswith("{"):
+                name, _, kind = term[1:-1].partition(":")
+                kind = kind or (name if name in SLOT_PATTERNS else "path")
+                nxt = next((n for s, k, n in node.slots if s == name and k == kind), None)
+                if nxt is None:
+                    nxt = _Node()
+                    node.slots.append((name, kind, nxt))
+                node = nxt
+            else:
+                node = node.children.setdefault(term, _Node())
+        node.rule = rule
+
+    @staticmethod
+    def tokenize(text: str) -> List[Tuple[str, str, bool, bool]]:
+        """(normalized term, raw word, slot allowed, introduced) tuples, stopwords dropped and repeats collapsed.
+
+        "slot allowed" means only connectors were skipped right before the word; "introduced" that a
+        connector or PATH_INTRODUCERS word came right before it.
+        """
+        tokens = []
+        skipped = []
+        previous = ""
+        text = re.sub(r"'s\b", " is", text.strip().rstrip("?!."))
+        for raw in RAW_WORD_RE.findall(text):
+            terms = normalize_terms(raw)
+            if not terms:
+                skipped.append(raw.lower())
+                continue
+            allowed = all(word in SLOT_CONNECTORS for word in skipped)
+            introduced = any(word in PATH_INTRODUCERS for word in skipped) or previous in PATH_INTRODUCERS
+            for term in terms:
+                if not tokens or tokens[-1][0] != term:
+                    tokens.append((term, raw, allowed, introduced))
+            skipped = []
+            previous = raw.lower()
+        return tokens
+
+    @staticmethod
+    def _slot_ok(kind: str, raw: str, introduced: bool) -> bool:
+        if not SLOT_PATTERNS[kind].fullmatch(raw) or raw.startswith("-"):
+            return False
+        if kind != "path":
+            return True
+        if raw.startswith((".", "~", "/")) or "/" in raw:
+            return True
+        return introduced and raw.lower() not in AMBIGUOUS_PLACES
+
+    def _walk(self, node: _Node, tokens: List[Tuple[str, str, bool, bool]], i: int, slots: Dict[str, str]):
+        if i == len(tokens):
+            return (node.rule, slots) if node.rule else None
+        term, raw, slot_allowed, introduced = tokens[i]
+        child = node.children.get(term)
+        if child is not None:
+            found = self._walk(child, tokens, i + 1, slots)
+            if found:
+                return found
+        for name, kind, nxt in node.slots if slot_allowed else ():
+            if self._slot_ok(kind, raw, introduced):
+                found = self._walk(nxt, tokens, i + 1, dict(slots, **{name: raw}))
+                if found:
+                    return found
+        return None
+
+    def match(self, text: str, record: bool = True) -> Optional[Tuple[str, str, str]]:
+        """(command, explanation, rule name) for a request matching a rule, else None.
+
+        record=False leaves the hit-rate counters untouched (for lookaheads such as prefetch).
+        """
+        found = self._walk(self.root, self.tokenize(text), 0, {})
+        if found is None:
+            if record:
+                self.misses += 1
+            return None
+        rule, slots = found
+        if record:
+            rule.hits += 1
+            self.hits += 1
+        command, explanation = rule.render(slots)
+        return command, explanation, rule.name
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "rules": len(self.rules),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
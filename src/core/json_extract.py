@@ -0,0 +1,211 @@
+import re
+import json
+from typing import Any, List, Optional, Tuple
+
+# Characters that can change scanner state; everything else is skipped in bulk
+STRUCTURAL_RE = re.compile(r'["\\{}\[\]]')
+CLOSERS = {"{": "}", "[": "]"}
+BARE_LITERALS = {"True": "true", "False": "false", "None": "null"}
+# A ```json (or unlabelled) fence; an unterminated one runs to the end of the text
+FENCE_RE = re.compile(r"```(?:json)?[ \t]*\n(.*?)(?:```|$)", re.IGNORECASE | re.DOTALL)
+
+
+def repair_json(fragment: str) -> str:
+    """Fix common LLM breakage: trailing commas, Python literals and truncated values"""
+    out = []
+    stack = []
+    in_string = False
+    escape = False
+    i = 0
+    n = len(fragment)
+    while i < n:
+        ch = fragment[i]
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            i += 1
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(CLOSERS[ch])
+        elif ch in "}]":
+            _strip_trailing(out, ",")
+            if stack:
+                stack.pop()
+        elif ch.isalpha():
+            word = re.match(r"[A-Za-z]+", fragment[i:]).group(0)
+            out.append(BARE_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        out.append(ch)
+        i += 1
+
+    if in_string:
+        if escape:
+            out.pop()
+        out.append('"')
+    if stack:
+        # Truncated: drop a dangling separator or an object key that never got its value
+        text = "".join(out)
+        while stack:
+            text = re.sub(r'(,|:)\s*$', "", text.rstrip())
+            if stack[-1] != "}":
+                break
+            text = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*$', r"\1", text)
+            text = re.sub(r",\s*$", "", text)
+            if not text.endswith("{"):
+                break
+            # Nothing of this object survived; drop it rather than invent an empty {} row
+            text = text[:-1]
+            stack.pop()
+        return text + "".join(reversed(stack))
+    return "".join(out)
+
+
+def _strip_trailing(out: List[str], char: str):
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == char:
+        del out[j]
+
+
+class JSONExtractor:
+    """Single-pass, incremental extraction of JSON values embedded in LLM text.
+
+    Code fences and prose around the JSON are skipped; braces inside strings are handled.
+    Feed streamed chunks with feed() and call finish() once the stream ends.
+    """
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self.spans: List[Tuple[int, int]] = []  # (start, end) of each value in buffer
+        self._parts: List[str] = []  # joined lazily; repeated str += is quadratic on long streams
+        self._length = 0
+        self._candidate: List[str] = []  # text of the open candidate, from its opening bracket
+        self._start: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._skip_until = -1  # absolute index after an escape sequence
+        self._decoder = json.JSONDecoder()
+
+    @property
+    def buffer(self) -> str:
+        """All text fed so far"""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume more text; returns values completed by this chunk"""
+        found = len(self.values)
+        base = self._length
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        if self._start is not None:
+            self._candidate.append(chunk)
+        pos = max(self._skip_until - base, 0)
+
+        while True:
+            match = STRUCTURAL_RE.search(chunk, max(pos, self._skip_until - base))
+            if match is None:
+                break
+            i = match.start()
+            pos = i + 1
+            ch = match.group(0)
+
+            if self._in_string:
+                if ch == "\\":
+                    self._skip_until = base + i + 2
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch in CLOSERS:
+                if self._start is None:
+                    # Fast path: a complete, valid value is parsed by the C decoder in one go
+                    try:
+                        value, end = self._decoder.raw_decode(chunk, i)
+                    except json.JSONDecodeError:
+                        self._start = base + i
+                        self._candidate = [chunk[i:]]
+                    else:
+                        self.values.append(value)
+                        self.spans.append((base + i, base + end))
+                        pos = end
+                        continue
+                self._stack.append(CLOSERS[ch])
+            elif self._start is None:
+                continue  # prose outside any candidate
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "}]":
+                if self._stack.pop() != ch:
+                    self._reset()
+                elif not self._stack:
+                    text = "".join(self._candidate)
+                    self._complete(text[:len(text) - (len(chunk) - i - 1)], base + i + 1)
+                    self._reset()
+
+        return self.values[found:]
+
+    def finish(self) -> Optional[Any]:
+        """Close out the stream; returns the first value, repairing a truncated tail if needed"""
+        if self._start is not None and not self.values:
+            candidate = "".join(self._candidate)
+            start = self._start
+            try:
+                self.values.append(json.loads(repair_json(candidate)))
+                self.spans.append((start, self._length))
+            except json.JSONDecodeError:
+                # The opening bracket may have been stray prose; rescan after it
+                rescan = JSONExtractor()
+                rescan.feed(candidate[1:])
+                rescan.finish()
+                self.values.extend(rescan.values)
+                self.spans.extend((start + 1 + a, start + 1 + b) for a, b in rescan.spans)
+            self._reset()
+        return self.values[0] if self.values else None
+
+    def best(self) -> Optional[Any]:
+        """The value a caller most likely wants: inside a ```json fence if there is one, else anywhere;
+        among those the largest object or array, so "Top [3] customers" prose loses to the table."""
+        if not self.values:
+            return None
+        fences = [m.span(1) for m in FENCE_RE.finditer(self.buffer)] if "```" in self.buffer else []
+        indices = [i for i, (start, end) in enumerate(self.spans)
+                   if any(a <= start and end <= b for a, b in fences)] or list(range(len(self.values)))
+        containers = [i for i in indices if isinstance(self.values[i], (dict, list))] or indices
+        # Largest span wins; on a tie the later value (max keeps the first, so compare reversed)
+        return self.values[max(reversed(containers), key=lambda i: self.spans[i][1] - self.spans[i][0])]
+
+    def _complete(self, candidate: str, end: int):
+        for text in (candidate, None):
+            try:
+                value = json.loads(candidate if text is not None else repair_json(candidate))
+            except json.JSONDecodeError:
+                continue
+            self.values.append(value)
+            self.spans.append((end - len(candidate), end))
+            return
+
+    def _reset(self):
+        self._start = None
+        self._candidate = []
+        self._stack = []
+        self._in_string = False
+
+    @classmethod
+    def extract_all(cls, text: str) -> List[Any]:
+        """Every JSON value found in text (a truncated trailing value is repaired)"""
+        extractor = cls()
+        extractor.feed(text)
+        extractor.finish()
+        return extractor.values
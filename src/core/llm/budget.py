@@ -0,0 +1,166 @@
+import re
+import math
+from typing import Dict, Optional, Tuple
+from src.core.prompts import Prompt
+
+WORD_RE = re.compile(r"\w+|[^\w\s]")
+# Lines that carry no content when repeated: page numbers ("Page 3 of 12", "- 4 -") and rules ("-----")
+BOILERPLATE_RE = re.compile(r"^\s*(?:(?:page\s*)?[-\s]*\d+[-\s]*(?:(?:of|/)\s*\d+)?|[-=_*#.~\s]+)\s*$", re.IGNORECASE)
+
+
+class PromptTooLarge(Exception):
+    """Raised locally when a prompt cannot fit the model's context window"""
+    pass
+
+
+class ModelLimits:
+    """Context window, output limit and approximate USD price per million tokens"""
+
+    def __init__(self, context_window: int, max_output: int, input_cost: float = 0.0, output_cost: float = 0.0):
+        self.context_window = context_window
+        self.max_output = max_output
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+
+
+# Keyed by model name without any "vendor/" prefix; prefixes match longer variants (e.g. gpt-4o-2024-08-06)
+MODEL_LIMITS: Dict[str, ModelLimits] = {
+    "gpt-4o-mini": ModelLimits(128000, 16384, 0.15, 0.6),
+    "gpt-4o": ModelLimits(128000, 16384, 2.5, 10.0),
+    "gpt-4-turbo": ModelLimits(128000, 4096, 10.0, 30.0),
+    "gpt-4": ModelLimits(8192, 4096, 30.0, 60.0),
+    "gpt-3.5-turbo": ModelLimits(16385, 4096, 0.5, 1.5),
+    "gpt-oss-120b": ModelLimits(131072, 32768, 0.15, 0.6),
+    "gpt-oss-20b": ModelLimits(131072, 32768, 0.075, 0.3),
+    "llama-3.3-70b-versatile": ModelLimits(131072, 32768, 0.59, 0.79),
+    "llama-3.1-70b-versatile": ModelLimits(131072, 8000, 0.59, 0.79),
+    "llama-3-70b-instruct": ModelLimits(8192, 4096, 0.59, 0.79),
+    "mixtral-8x7b-32768": ModelLimits(32768, 4096, 0.24, 0.24),
+    "gemma2-9b-it": ModelLimits(8192, 4096, 0.2, 0.2),
+    "claude-3-opus": ModelLimits(200000, 4096, 15.0, 75.0),
+    "gemini-1.5-pro": ModelLimits(2097152, 8192, 1.25, 5.0),
+    "gemini-1.5-flash": ModelLimits(1048576, 8192, 0.075, 0.3),
+    "gemini-pro-vision": ModelLimits(12288, 4096, 0.5, 1.5),
+    "gemini-pro": ModelLimits(32760, 8192, 0.5, 1.5),
+    "gemini-ultra": ModelLimits(32760, 8192, 0.0, 0.0),
+}
+
+DEFAULT_LIMITS = ModelLimits(8192, 1024)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate BPE token count without a tokenizer (roughly within 10-15% for English and code)"""
+    if not text:
+        return 0
+    pieces = WORD_RE.findall(text)
+    # Long words split into several BPE tokens; short words and punctuation are usually one
+    long_extra = sum(len(p) // 6 for p in pieces if len(p) > 6)
+    return max(len(pieces) + long_extra, math.ceil(len(text) / 4))
+
+
+def get_limits(model: str) -> ModelLimits:
+    """Look up limits for model, matching on the name without its vendor prefix"""
+    name = model.lower().split("/")[-1]
+    if name in MODEL_LIMITS:
+        return MODEL_LIMITS[name]
+    matches = [key for key in MODEL_LIMITS if name.startswith(key)]
+    return MODEL_LIMITS[max(matches, key=len)] if matches else DEFAULT_LIMITS
+
+
+class TokenBudget:
+    """Fits prompts into a model's context window before they are sent"""
+
+    def __init__(self, config):
+        self.config = config
+
+    @staticmethod
+    def dedupe_lines(text: str) -> str:
+        """Collapse runs of blank lines and drop repeated page numbers and separator rules.
+
+        Other repeated lines stay: identical rows in a table or log are real content.
+        """
+        seen = set()
+        lines = []
+        for line in text.split("\n"):
+            key = line.strip()
+            if not key:
+                if lines and not lines[-1].strip():
+                    continue
+            elif BOILERPLATE_RE.match(key):
+                if key in seen:
+                    continue
+                seen.add(key)
+            lines.append(line)
+        return "\n".join(lines)
+
+    def fit(self, prompt: str, model: str, reserved: int = 0) -> Tuple[str, Dict[str, object]]:
+        """Return (prompt, report), trimming or raising PromptTooLarge when over budget.
+
+        reserved is the token count of prompt parts sent alongside this text that must not be trimmed.
+        """
+        limits = get_limits(model)
+        budget = limits.context_window - limits.max_output
+        if self.config.max_prompt_tokens:
+            budget = min(budget, self.config.max_prompt_tokens)
+        available = max(budget - reserved, 0)
+
+        tokens = estimate_tokens(prompt)
+        action = "ok"
+        if tokens > available:
+            prompt = self.dedupe_lines(prompt)
+            tokens = estimate_tokens(prompt)
+            action = "deduped"
+
+        if tokens > available:
+            if self.config.on_overflow != "trim" or not available:
+                raise PromptTooLarge(f"Prompt is ~{tokens + reserved:,} tokens; {model} allows ~{budget:,} input tokens")
+            trimmed = self._trim_middle(prompt, tokens, available)
+            if trimmed is None:
+                raise PromptTooLarge(f"Prompt is ~{tokens + reserved:,} tokens; {model} allows ~{budget:,} input tokens "
+                                     f"and it cannot be trimmed that far")
+            prompt = trimmed
+            tokens = estimate_tokens(prompt)
+            action = "trimmed"
+
+        tokens += reserved
+        cost = (tokens * limits.input_cost + limits.max_output * limits.output_cost) / 1_000_000
+        report = {"tokens": tokens, "budget": budget, "max_output": limits.max_output, "max_cost": cost, "action": action}
+        return prompt, report
+
+    def fit_prompt(self, prompt: Prompt, model: str) -> Tuple[Prompt, Dict[str, object]]:
+        """fit() for a structured prompt: only the context (or, without one, the question) is trimmed"""
+        # History is already bounded by SessionMemory, so it is reserved rather than trimmed
+        fixed = estimate_tokens(prompt.system) + sum(estimate_tokens(content) for _, content in prompt.history)
+        if prompt.context:
+            context, report = self.fit(prompt.context, model, fixed + estimate_tokens(prompt.question))
+            return prompt.with_context(context), report
+        question, report = self.fit(prompt.question, model, fixed)
+        return Prompt(prompt.system, question, history=prompt.history), report
+
+    @staticmethod
+    def _trim_middle(prompt: str, tokens: int, budget: int) -> Optional[str]:
+        """Keep the instructions at the head and the question at the tail, dropping context in between
+        until the estimate fits budget; None if even the omission marker alone does not fit"""
+        keep_chars = int(len(prompt) * budget / tokens * 0.95)
+        while keep_chars > 0:
+            head = keep_chars * 2 // 3
+            tail = keep_chars - head
+            dropped = len(prompt) - keep_chars
+            text = (f"{prompt[:head]}\n\n[... {dropped:,} characters omitted to fit the context window ...]\n\n"
+                    f"{prompt[-tail:] if tail > 0 else ''}")
+            current = estimate_tokens(text)
+            if current <= budget:
+                return text
+            # The marker and character-to-token ratio differ from the estimate; shrink and re-check
+            keep_chars = min(keep_chars - 1, int(keep_chars * budget / current * 0.95))
+        return None
+
+    @staticmethod
+    def describe(report: Dict[str, object]) -> str:
+        """Short human-readable summary of a fit() report"""
+        text = f"~{report['tokens']:,} prompt tokens (limit {report['budget']:,})"
+        if report["max_cost"]:
+            text += f", est. cost ≤ ${report['max_cost']:.4f}"
+        if report["action"] != "ok":
+            text += f" [{report['action']}]"
+        return text
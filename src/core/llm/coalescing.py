@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+TokenCallback = Callable[[str], None]
+
+
+class _Shared:
+    """One in-flight call and the streamed tokens it has produced so far"""
+
+    def __init__(self):
+        self.task: Optional[asyncio.Future] = None
+        self.tokens: List[str] = []
+        self.subscribers: List[TokenCallback] = []
+        self.waiters = 0
+
+    def broadcast(self, token: str):
+        self.tokens.append(token)
+        for callback in list(self.subscribers):
+            callback(token)
+
+    def subscribe(self, callback: TokenCallback):
+        # Late joiners first catch up on what has already streamed
+        if self.tokens:
+            callback("".join(self.tokens))
+        self.subscribers.append(callback)
+
+
+class RequestCoalescer:
+    """Lets identical concurrent requests share one LLM call.
+
+    The first caller for a key starts the call as its own task; later callers with the same key wait
+    on that task and receive its streamed tokens too. The call is cancelled only when every waiter
+    has gone, so one cancelled duplicate never cancels the others. Runs on the engine's event loop.
+    """
+
+    def __init__(self):
+        self.inflight: Dict[Hashable, _Shared] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, call: Callable[[Optional[TokenCallback]], Awaitable[Any]],
+                  on_token: Optional[TokenCallback] = None) -> Any:
+        """Await call(on_token) once per key; call gets a fan-out token callback if the starter streams"""
+        shared = self.inflight.get(key)
+        if shared is None:
+            shared = _Shared()
+            shared.task = asyncio.ensure_future(call(shared.broadcast if on_token else None))
+            shared.task.add_done_callback(lambda _: self._release(key, shared))
+            self.inflight[key] = shared
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+        if on_token is not None:
+            shared.subscribe(on_token)
+        shared.waiters += 1
+        try:
+            return await asyncio.shield(shared.task)
+        finally:
+            shared.waiters -= 1
+            if on_token in shared.subscribers:
+                shared.subscribers.remove(on_token)
+            if shared.waiters == 0 and not shared.task.done():
+                self._release(key, shared)  # a newcomer must not join a call that is being cancelled
+                shared.task.cancel()
+
+    def _release(self, key: Hashable, shared: _Shared):
+        if self.inflight.get(key) is shared:
+            del self.inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.calls + self.coalesced
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.inflight),
+            "coalesce_rate": self.coalesced / total if total else 0.0,
+        }
@@ -1,59 +1,163 @@
+import copy
 from abc import ABC, abstractmethod
-from typing import Optional
-from langchain_core.language_models import BaseChatModel
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
-from langchain_google_genai import ChatGoogleGenerativeAI
-from src.core.config import settings
+from typing import TYPE_CHECKING, Optional, Dict, List, Tuple
+from src.core.config import settings, LLMConfig
+
+# Provider SDKs and httpx are imported on first use; they dominate import time
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from src.core.llm.http_pool import HttpClientPool
 
 class LLMProvider(ABC):
+    # Endpoint probed by the connection warm-up; None if the SDK manages its own transport
+    base_url: Optional[str] = None
+    requires_key = True
+
     @abstractmethod
-    def create_client(self, api_key: str, model: str, temperature: float) -> BaseChatModel:
+    def create_client(self, api_key: str, model: str, temperature: float, http_clients=None) -> "BaseChatModel":
         pass
 
 class GroqProvider(LLMProvider):
-    def create_client(self, api_key: str, model: str, temperature: float) -> BaseChatModel:
-        return ChatGroq(api_key=api_key, model_name=model, temperature=temperature)
+    base_url = "https://api.groq.com/openai/v1"
+
+    def create_client(self, api_key: str, model: str, temperature: float, http_clients=None) -> "BaseChatModel":
+        from langchain_groq import ChatGroq
+        client, async_client = http_clients or (None, None)
+        return ChatGroq(api_key=api_key, model_name=model, temperature=temperature, max_retries=0,
+                        http_client=client, http_async_client=async_client)
 
 class OpenAIProvider(LLMProvider):
-    def create_client(self, api_key: str, model: str, temperature: float) -> BaseChatModel:
-        return ChatOpenAI(api_key=api_key, model=model, temperature=temperature)
+    base_url = "https://api.openai.com/v1"
+
+    def create_client(self, api_key: str, model: str, temperature: float, http_clients=None) -> "BaseChatModel":
+        from langchain_openai import ChatOpenAI
+        client, async_client = http_clients or (None, None)
+        return ChatOpenAI(api_key=api_key, model=model, temperature=temperature, stream_usage=True, max_retries=0,
+                          http_client=client, http_async_client=async_client)
 
 class OpenRouterProvider(LLMProvider):
-    def create_client(self, api_key: str, model: str, temperature: float) -> BaseChatModel:
+    base_url = "https://openrouter.ai/api/v1"
+
+    def create_client(self, api_key: str, model: str, temperature: float, http_clients=None) -> "BaseChatModel":
+        from langchain_openai import ChatOpenAI
+        client, async_client = http_clients or (None, None)
         return ChatOpenAI(
             api_key=api_key,
-            base_url="https://openrouter.ai/api/v1",
+            base_url=self.base_url,
             model=model,
-            temperature=temperature
+            temperature=temperature,
+            stream_usage=True,  # usage (including cached prompt tokens) on the final streamed chunk
+            max_retries=0,  # RequestScheduler retries, honouring Retry-After across all waiting requests
+            http_client=client,
+            http_async_client=async_client
         )
 
 class GeminiProvider(LLMProvider):
-    def create_client(self, api_key: str, model: str, temperature: float) -> BaseChatModel:
-        return ChatGoogleGenerativeAI(google_api_key=api_key, model=model, temperature=temperature)
+    # The Google SDK keeps its own channel; reusing the client instance keeps it warm
+    def create_client(self, api_key: str, model: str, temperature: float, http_clients=None) -> "BaseChatModel":
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(google_api_key=api_key, model=model, temperature=temperature, max_retries=0)
+
+class LocalProvider(LLMProvider):
+    """OpenAI-compatible stand-in server (src.core.llm.fake_server) for offline runs and benchmarks"""
+    base_url = "http://127.0.0.1:8765/v1"
+    requires_key = False
+
+    def create_client(self, api_key: str, model: str, temperature: float, http_clients=None) -> "BaseChatModel":
+        from langchain_openai import ChatOpenAI
+        client, async_client = http_clients or (None, None)
+        return ChatOpenAI(
+            api_key=api_key or "local",
+            base_url=self.base_url,
+            model=model,
+            temperature=temperature,
+            stream_usage=True,  # usage (including cached prompt tokens) on the final streamed chunk
+            max_retries=0,  # RequestScheduler retries, honouring Retry-After across all waiting requests
+            http_client=client,
+            http_async_client=async_client
+        )
 
 class LLMFactory:
     """Factory to create LLM clients based on configuration"""
-    
+
     PROVIDERS = {
         "groq": GroqProvider(),
         "openai": OpenAIProvider(),
         "openrouter": OpenRouterProvider(),
-        "gemini": GeminiProvider()
+        "gemini": GeminiProvider(),
+        "local": LocalProvider()
     }
-    
+
+    _pool: Optional["HttpClientPool"] = None
+    _clients: Dict[Tuple, "BaseChatModel"] = {}
+
     @classmethod
-    def create_llm(cls) -> Optional[BaseChatModel]:
-        config = settings.config.llm
-        if not config.api_key:
-            return None
-            
+    def get_pool(cls) -> "HttpClientPool":
+        """Get the shared HTTP client pool, creating it from config on first use"""
+        if cls._pool is None:
+            from src.core.llm.http_pool import HttpClientPool
+            http = settings.config.http
+            cls._pool = HttpClientPool(
+                max_connections=http.max_connections,
+                max_keepalive_connections=http.max_keepalive_connections,
+                keepalive_expiry=http.keepalive_expiry,
+                timeout=settings.config.llm.request_timeout
+            )
+        return cls._pool
+
+    @classmethod
+    def get_provider(cls, config: LLMConfig) -> LLMProvider:
+        """Provider for config, pointed at config.base_url when one is set"""
         provider = cls.PROVIDERS.get(config.provider.lower())
         if not provider:
             raise ValueError(f"Unsupported provider: {config.provider}")
-            
-        return provider.create_client(
-            api_key=config.api_key,
-            model=config.model_name,
-            temperature=config.temperature
-        )
+        if config.base_url and provider.base_url and config.base_url.rstrip("/") != provider.base_url:
+            provider = copy.copy(provider)
+            provider.base_url = config.base_url.rstrip("/")
+        return provider
+
+    @classmethod
+    def create_llm(cls, config: Optional[LLMConfig] = None) -> Optional["BaseChatModel"]:
+        """Create (or reuse) a client for config, defaulting to the configured primary provider"""
+        config = config or settings.config.llm
+        provider = cls.get_provider(config)
+        if provider.requires_key and not config.api_key:
+            return None
+
+        # Reuse the client (and its pooled connections) while the configuration is unchanged
+        name = config.provider.lower()
+        key = (name, config.model_name, config.api_key, config.temperature, provider.base_url)
+        if key not in cls._clients:
+            http_clients = cls.get_pool().get_clients(name) if provider.base_url else None
+            cls._clients[key] = provider.create_client(
+                api_key=config.api_key,
+                model=config.model_name,
+                temperature=config.temperature,
+                http_clients=http_clients
+            )
+        return cls._clients[key]
+
+    @classmethod
+    def provider_pool(cls) -> List[Tuple[str, LLMConfig]]:
+        """Ordered (label, config) pool: the primary provider followed by routing fallbacks"""
+        configs = [settings.config.llm]
+        if settings.config.routing.enabled:
+            configs += settings.config.routing.providers
+        return [(f"{c.provider.lower()}:{c.model_name}", c) for c in configs]
+
+    @classmethod
+    async def warm_up(cls):
+        """Pre-open a keep-alive connection to the configured provider"""
+        config = settings.config.llm
+        try:
+            provider = cls.get_provider(config)
+        except ValueError:
+            return
+        if (provider.requires_key and not config.api_key) or not provider.base_url:
+            return
+        await cls.get_pool().warm_up(config.provider.lower(), f"{provider.base_url}/models")
+
+    @classmethod
+    def connection_stats(cls):
+        """Get connection reuse metrics for each provider used so far"""
+        return cls.get_pool().get_stats() if cls._pool else {}
@@ -0,0 +1,289 @@
+"""OpenAI-compatible stand-in chat server for offline runs, benchmarks and CI.
+
+Usage:
+    python -m src.core.llm.fake_server --port 8765 --latency 0.3 --jitter 0.1 --error-rate 0.05
+
+Then select the "local" provider (its default endpoint is http://127.0.0.1:8765/v1).
+Only the standard library is used, so it starts without any provider SDK installed.
+"""
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from src.core.llm.budget import estimate_tokens
+
+# Replies per task type; the mode is guessed from the prompt the same way the UI builds it
+CANNED_RESPONSES = {
+    "command": (
+        "```json\n"
+        '{"command_nlp": "list files in the current directory", "command_shell": "ls -la", '
+        '"explanation": "Lists all files, including hidden ones, with details.", "is_safe": true}\n'
+        "```"
+    ),
+    "analyst": (
+        "Here is the summary table:\n```json\n"
+        '{"columns": ["metric", "value"], "rows": [["files", 42], ["errors", 3], ["warnings", 17]], '
+        '"summary": "3 errors and 17 warnings across 42 files."}\n'
+        "```"
+    ),
+    "developer": (
+        "```python\n"
+        "def read_lines(path):\n"
+        "    with open(path, encoding=\"utf-8\") as f:\n"
+        "        return [line.rstrip(\"\\n\") for line in f]\n"
+        "```"
+    ),
+}
+
+TOKEN_RE = re.compile(r"\s*\S{1,4}|\s+")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default backlog of 5 drops connections under benchmark concurrency
+
+
+def detect_mode(prompt: str) -> str:
+    """Guess which task type a prompt was built for"""
+    if "Data Analyst" in prompt:
+        return "analyst"
+    if "Senior Developer" in prompt:
+        return "developer"
+    return "command"
+
+
+class FakeChatServer:
+    """Threaded /v1/chat/completions server with configurable latency, jitter and error injection.
+
+    latency is the delay before the first byte, jitter a uniform +/- spread around it and token_delay
+    the pause between streamed chunks. A fraction error_rate of requests fail with error_status.
+    Prompt caching is simulated like OpenAI's: tokens of the longest previously seen message prefix
+    are reported as usage.prompt_tokens_details.cached_tokens.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.05, jitter: float = 0.0,
+                 token_delay: float = 0.0, error_rate: float = 0.0, error_status: int = 500,
+                 responses: Optional[Dict[str, str]] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responses = dict(CANNED_RESPONSES, **(responses or {}))
+        self.requests: deque = deque(maxlen=1000)  # recent request bodies, newest last
+        self.prefixes: "OrderedDict[str, int]" = OrderedDict()  # message-prefix digest -> token count
+        self.cached_tokens = 0
+        self.served = 0
+        self.failed = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = 0
+        self._thread: Optional[threading.Thread] = None
+        self._httpd = _Server((host, port), self._handler())
+
+    @property
+    def url(self) -> str:
+        """Base URL to configure as the provider endpoint"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeChatServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-chat-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reply_for(self, body: Dict[str, Any]) -> str:
+        """Canned reply for a chat request body"""
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        return self.responses[detect_mode(prompt)]
+
+    def cache_prefixes(self, messages: List[Dict[str, Any]]) -> int:
+        """Record every message prefix of a request; returns tokens covered by the longest one seen before"""
+        digest = hashlib.sha1()
+        tokens = 0
+        cached = 0
+        with self._lock:
+            for message in messages:
+                digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+                tokens += estimate_tokens(str(message.get("content", "")))
+                key = digest.hexdigest()
+                if key in self.prefixes:
+                    cached = tokens
+                    self.prefixes.move_to_end(key)
+                else:
+                    self.prefixes[key] = tokens
+                    if len(self.prefixes) > 10000:
+                        self.prefixes.popitem(last=False)
+            self.cached_tokens += cached
+        return cached
+
+    def _plan(self):
+        """Draw (delay, fail) for one request"""
+        with self._lock:
+            self._ids += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.failed += 1
+            else:
+                self.served += 1
+            return self._ids, delay, fail
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse behaves like a real endpoint
+            disable_nagle_algorithm = True  # headers and body are separate writes
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client cancelled mid-response
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    self._send_json(200, {"object": "list", "data": [{"id": "stand-in", "object": "model"}]})
+                else:
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": {"message": "Invalid JSON body", "type": "invalid_request_error"}})
+                    return
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+                server.requests.append(body)
+
+                request_no, delay, fail = server._plan()
+                time.sleep(delay)
+                if fail:
+                    headers = {"Retry-After": "1"} if server.error_status == 429 else {}
+                    self._send_json(server.error_status,
+                                    {"error": {"message": "Injected failure", "type": "server_error"}}, headers)
+                    return
+
+                text = server.reply_for(body)
+                model = body.get("model", "stand-in")
+                completion_id = f"chatcmpl-fake-{request_no}"
+                prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+                usage = {"prompt_tokens": estimate_tokens(prompt), "completion_tokens": estimate_tokens(text)}
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                cached = server.cache_prefixes(body.get("messages", []))
+                usage["prompt_tokens_details"] = {"cached_tokens": min(cached, usage["prompt_tokens"])}
+
+                if body.get("stream"):
+                    self._stream(completion_id, model, text, usage, body.get("stream_options") or {})
+                else:
+                    self._send_json(200, {
+                        "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                     "finish_reason": "stop"}],
+                        "usage": usage,
+                    })
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, completion_id: str, model: str, text: str, usage: Dict[str, int],
+                        stream_options: Dict[str, Any]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                created = int(time.time())
+                pieces: List[str] = TOKEN_RE.findall(text)
+                for i, piece in enumerate(pieces):
+                    delta = {"role": "assistant", "content": piece} if i == 0 else {"content": piece}
+                    self._event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                                 "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                    if server.token_delay:
+                        time.sleep(server.token_delay)
+                self._event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                             "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+                if stream_options.get("include_usage"):
+                    self._event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                                 "model": model, "choices": [], "usage": usage})
+                self._chunk(b"data: [DONE]\n\n")
+                self._chunk(b"")
+
+            def _event(self, payload: Dict[str, Any]):
+                self._chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+            def _chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the OpenAI-compatible stand-in chat server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first byte")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- spread around --latency")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected failures")
+    parser.add_argument("--responses", help="JSON file mapping task type (command/analyst/developer) to reply text")
+    parser.add_argument("--seed", type=int, help="Seed for reproducible jitter and failures")
+    args = parser.parse_args(argv)
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+
+    server = FakeChatServer(args.host, args.port, args.latency, args.jitter, args.token_delay,
+                            args.error_rate, args.error_status, responses, args.seed)
+    print(f"Stand-in chat server listening on {server.url}", file=sys.stderr)
+    try:
+        server.start()
+        server._thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class LatencyTracker:
+    """Rolling window of request latencies with percentile lookup"""
+
+    def __init__(self, window: int = 200, min_samples: int = 10):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get the p-th percentile (0..1), or None until enough samples exist"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(int(p * len(ordered)), len(ordered) - 1)
+        return ordered[index]
+
+
+class Hedger:
+    """Sends a backup request to a secondary provider when the primary is slow"""
+
+    def __init__(self, config):
+        self.config = config
+        self.latency = LatencyTracker()
+        self.requests = 0
+        self.hedged = 0
+        self.primary_wins = 0
+        self.secondary_wins = 0
+
+    def delay(self) -> float:
+        """Seconds to wait for the primary before hedging"""
+        observed = self.latency.percentile(self.config.delay_percentile)
+        if observed is None:
+            return self.config.initial_delay
+        return min(max(observed, self.config.min_delay), self.config.max_delay)
+
+    async def run(self, primary: Callable[[], Awaitable[Any]],
+                  secondary: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """Return the first successful result; the slower attempt is cancelled"""
+        self.requests += 1
+        start = time.monotonic()
+        primary_task = asyncio.ensure_future(primary())
+        tasks = {primary_task: "primary"}
+
+        try:
+            if secondary is not None:
+                await asyncio.wait(tasks, timeout=self.delay())
+                if not primary_task.done() or primary_task.exception() is not None:
+                    self.hedged += 1
+                    tasks[asyncio.ensure_future(secondary())] = "secondary"
+
+            error = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    label = tasks.pop(task)
+                    if label == "primary":
+                        self.latency.record(time.monotonic() - start)
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+
+                    if label == "primary":
+                        self.primary_wins += 1
+                    else:
+                        self.secondary_wins += 1
+                    return task.result()
+            raise error
+        finally:
+            if primary_task in tasks:
+                # A primary slower than the winner still counts, as a lower bound; otherwise only fast
+                # primaries are sampled and the hedge delay drifts ever lower
+                self.latency.record(time.monotonic() - start)
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hedge rate and win counts for tuning the delay"""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+            "primary_wins": self.primary_wins,
+            "secondary_wins": self.secondary_wins,
+            "delay": self.delay(),
+        }
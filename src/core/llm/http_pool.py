@@ -0,0 +1,95 @@
+import threading
+from typing import Dict, Tuple, Any
+import httpx
+
+
+class ConnectionStats:
+    """Counts requests and newly opened connections for one provider"""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+
+    def trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    async def atrace(self, event_name: str, info: Dict[str, Any]):
+        self.trace(event_name, info)
+
+    def as_dict(self) -> Dict[str, Any]:
+        reused = max(self.requests - self.new_connections, 0)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused": reused,
+            "reuse_ratio": reused / self.requests if self.requests else 0.0,
+        }
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        request.extensions.setdefault("trace", self.stats.trace)
+        return super().handle_request(request)
+
+
+class _AsyncCountingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.stats.requests += 1
+        request.extensions.setdefault("trace", self.stats.atrace)
+        return await super().handle_async_request(request)
+
+
+class HttpClientPool:
+    """Keeps one long-lived keep-alive HTTP client pair per provider"""
+
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 120.0, timeout: float = 60.0):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.stats: Dict[str, ConnectionStats] = {}
+        self._clients: Dict[str, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+        self._lock = threading.Lock()
+
+    def get_clients(self, provider: str) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        """Get the (sync, async) clients for provider, creating them on first use"""
+        with self._lock:
+            if provider not in self._clients:
+                stats = self.stats.setdefault(provider, ConnectionStats())
+                self._clients[provider] = (
+                    httpx.Client(transport=_CountingTransport(stats, limits=self.limits), timeout=self.timeout),
+                    httpx.AsyncClient(transport=_AsyncCountingTransport(stats, limits=self.limits), timeout=self.timeout),
+                )
+            return self._clients[provider]
+
+    async def warm_up(self, provider: str, url: str):
+        """Open a pooled connection to url so the first real request skips DNS/TCP/TLS setup"""
+        _, async_client = self.get_clients(provider)
+        try:
+            await async_client.get(url)
+        except httpx.HTTPError as e:
+            print(f"Connection warm-up failed for {provider}: {e}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get connection reuse metrics per provider"""
+        return {provider: stats.as_dict() for provider, stats in self.stats.items()}
+
+    def close(self):
+        """Close the synchronous clients (async clients close with their event loop)"""
+        with self._lock:
+            for client, _ in self._clients.values():
+                client.close()
+            self._clients.clear()
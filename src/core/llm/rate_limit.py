@@ -0,0 +1,200 @@
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+# Lower runs first: interactive command translation, then analyst/developer work, then background
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = ("Timeout", "APIConnectionError", "ConnectError", "ReadError", "RemoteProtocolError",
+                   "ResourceExhausted", "ServiceUnavailable")
+
+
+class TokenBucket:
+    """Classic token bucket: capacity tokens, refilled continuously over one minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until amount tokens are available (0 if they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)  # a single oversized request must not wait forever
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+def status_of(error: Exception) -> Optional[int]:
+    """HTTP status of a provider SDK error, if it carries one"""
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Server-requested wait from Retry-After / retry-after-ms headers, in seconds"""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None  # HTTP-date form; fall back to exponential backoff
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return any(name in type(error).__name__ for name in RETRYABLE_NAMES)
+
+
+class ProviderScheduler:
+    """Admits requests to one provider in priority order within its request and token budgets"""
+
+    def __init__(self, name: str, requests_per_minute: int, tokens_per_minute: int):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0  # set by a 429 so every waiter backs off, not just the failed request
+        self._queue: List[list] = []  # heap of [priority, seq, wake future]
+        self._seq = itertools.count()
+        self.admitted = 0
+        self.waited = 0
+        self.wait_time = 0.0
+        self.throttled = 0
+        self.retries = 0
+
+    def _delay(self, tokens: int) -> float:
+        return max(self.paused_until - time.monotonic(), self.requests.delay(1), self.tokens.delay(tokens))
+
+    def _wake_head(self):
+        if self._queue and not self._queue[0][2].done():
+            self._queue[0][2].set_result(None)
+
+    async def acquire(self, tokens: int, priority: int = PRIORITY_NORMAL):
+        """Wait until this request is first in line and its budgets allow it"""
+        loop = asyncio.get_running_loop()
+        entry = [priority, next(self._seq), loop.create_future()]
+        heapq.heappush(self._queue, entry)
+        start = time.monotonic()
+        try:
+            while True:
+                if self._queue[0] is entry:
+                    delay = self._delay(tokens)
+                    if delay <= 0:
+                        heapq.heappop(self._queue)
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        break
+                else:
+                    delay = None  # woken when we reach the head
+                # A newcomer with higher priority may take the head while we sleep
+                await asyncio.wait({entry[2]}, timeout=delay)
+                entry[2] = loop.create_future()
+        except asyncio.CancelledError:
+            if entry in self._queue:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+            raise
+        finally:
+            self._wake_head()
+
+        waited = time.monotonic() - start
+        self.admitted += 1
+        if waited > 0.001:
+            self.waited += 1
+            self.wait_time += waited
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "queued": len(self._queue),
+            "waited": self.waited,
+            "wait_time": self.wait_time,
+            "throttled": self.throttled,
+            "retries": self.retries,
+        }
+
+
+class RequestScheduler:
+    """Per-provider token buckets plus Retry-After-aware exponential backoff with jitter"""
+
+    def __init__(self, config):
+        self.config = config
+        self.providers: Dict[str, ProviderScheduler] = {}
+
+    def get(self, provider: str) -> ProviderScheduler:
+        if provider not in self.providers:
+            limits = self.config.overrides.get(provider, {})
+            self.providers[provider] = ProviderScheduler(
+                provider,
+                limits.get("requests_per_minute", self.config.requests_per_minute),
+                limits.get("tokens_per_minute", self.config.tokens_per_minute)
+            )
+        return self.providers[provider]
+
+    def backoff(self, attempt: int, error: Exception) -> float:
+        requested = retry_after(error)
+        if requested is not None:
+            return min(requested, self.config.backoff_max) + random.uniform(0, 0.25)
+        # Exponential with "equal jitter": half fixed, half random, so retries spread out
+        delay = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def run(self, provider: str, call: Callable[[], Awaitable[Any]], tokens: int = 0,
+                  priority: int = PRIORITY_NORMAL,
+                  on_retry: Optional[Callable[[str], None]] = None,
+                  can_retry: Optional[Callable[[], bool]] = None) -> Any:
+        """Run call() once admitted, retrying throttling and transient errors while can_retry() allows"""
+        scheduler = self.get(provider)
+        attempt = 0
+        while True:
+            if self.config.enabled:
+                await scheduler.acquire(tokens, priority)
+            try:
+                return await call()
+            except Exception as e:
+                if attempt >= self.config.max_retries or not is_retryable(e) or (can_retry and not can_retry()):
+                    raise
+                delay = self.backoff(attempt, e)
+                if status_of(e) == 429:
+                    scheduler.throttled += 1
+                    scheduler.pause(delay)
+                scheduler.retries += 1
+                attempt += 1
+                if on_retry is not None:
+                    on_retry(f"{provider}: {type(e).__name__}, retry {attempt}/{self.config.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        metrics = {}
+        for name, scheduler in self.providers.items():
+            metrics.update({f"{name}.{k}": v for k, v in scheduler.stats().items()})
+        return metrics
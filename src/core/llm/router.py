@@ -0,0 +1,168 @@
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class CircuitBreaker:
+    """Stops routing to a provider after repeated failures until a cooldown passes"""
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        # Set while the single half-open trial request is in flight
+        self.probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Closed breakers let requests through; half-open ones let one trial through at a time"""
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.probing)
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def trip(self):
+        self.opened_at = time.monotonic()
+
+
+class ProviderHealth:
+    """Rolling latency and error-rate tracking for one provider"""
+
+    def __init__(self, name: str, config):
+        self.name = name
+        self.config = config
+        self.breaker = CircuitBreaker(config.failure_threshold, config.cooldown)
+        self.outcomes = deque(maxlen=config.window)  # True for success
+        self.ewma_latency: Optional[float] = None
+        self.last_error = ""
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def record_success(self, latency: float):
+        self.outcomes.append(True)
+        alpha = self.config.latency_alpha
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = alpha * latency + (1 - alpha) * self.ewma_latency
+        self.breaker.record_success()
+
+    def record_failure(self, error: Exception):
+        self.outcomes.append(False)
+        status = getattr(error, "status_code", None)
+        self.last_error = f"{status} {type(error).__name__}" if status else type(error).__name__
+        self.breaker.record_failure()
+        if len(self.outcomes) >= self.config.min_samples and self.error_rate >= self.config.max_error_rate:
+            self.breaker.trip()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "latency": self.ewma_latency if self.ewma_latency is not None else "-",
+            "error_rate": self.error_rate,
+            "last_error": self.last_error or "-",
+        }
+
+
+class ProviderRouter:
+    """Routes each request to the fastest healthy provider and fails over on errors"""
+
+    def __init__(self, config):
+        self.config = config
+        self.entries: List[Tuple[str, Any]] = []
+        self.health: Dict[str, ProviderHealth] = {}
+        self.last_route = ""
+        self.failovers = 0
+        # Called with a human-readable message whenever the route changes or fails over
+        self.listener: Optional[Callable[[str], None]] = None
+
+    def set_pool(self, entries: List[Tuple[str, Any]]):
+        """Replace the ordered (name, llm) pool, keeping health history for known names"""
+        self.entries = [(name, llm) for name, llm in entries if llm is not None]
+        for name, _ in self.entries:
+            if name not in self.health:
+                self.health[name] = ProviderHealth(name, self.config)
+
+    def candidates(self) -> List[Tuple[str, Any]]:
+        """Healthy providers, fastest first; unmeasured ones keep their configured order"""
+        healthy = [e for e in self.entries if self.health[e[0]].breaker.allow()]
+        if not healthy:
+            # Everything is tripped: try the least recently opened breaker first
+            return sorted(self.entries, key=lambda e: self.health[e[0]].breaker.opened_at or 0)
+
+        def rank(item):
+            index, (name, _) = item
+            latency = self.health[name].ewma_latency
+            return (latency is None, latency or 0.0, index)
+        return [entry for _, entry in sorted(enumerate(healthy), key=rank)]
+
+    async def run(self, call: Callable[[str, Any], Awaitable[Any]],
+                  can_failover: Callable[[], bool] = lambda: True) -> Any:
+        """Invoke call(name, llm) on the best provider, falling over to the next on failure
+
+        can_failover is checked after a failure; once it returns False (e.g. tokens were already
+        streamed to the caller) the error is raised instead of replaying the request elsewhere.
+        """
+        error = None
+        for attempt, (name, llm) in enumerate(self.candidates()):
+            breaker = self.health[name].breaker
+            probe = breaker.state == "half_open"
+            if probe and breaker.probing:
+                # Another request is already testing this provider
+                error = error or RuntimeError(f"{name} is recovering; a trial request is in flight")
+                continue
+            if name != self.last_route:
+                reason = "failover" if attempt else "fastest healthy"
+                self._notify(f"Routing to {name} ({reason})")
+                self.last_route = name
+
+            health = self.health[name]
+            breaker.probing = probe
+            start = time.monotonic()
+            try:
+                result = await call(name, llm)
+            except Exception as e:
+                health.record_failure(e)
+                if not can_failover():
+                    self._notify(f"{name} failed mid-reply ({health.last_error}); not failing over")
+                    raise
+                self.failovers += 1
+                self._notify(f"{name} failed ({health.last_error}); breaker {health.breaker.state}")
+                error = e
+                continue
+            finally:
+                breaker.probing = False
+            health.record_success(time.monotonic() - start)
+            return result
+
+        if error is None:
+            raise RuntimeError("No LLM providers configured")
+        raise error
+
+    def _notify(self, message: str):
+        if self.listener is not None and len(self.entries) > 1:
+            self.listener(message)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get per-provider routing health as a flat mapping"""
+        metrics = {"last": self.last_route or "-", "failovers": self.failovers}
+        for name, health in self.health.items():
+            metrics.update({f"{name}.{k}": v for k, v in health.as_dict().items()})
+        return metrics
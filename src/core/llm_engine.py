@@ -1,20 +1,77 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from src.core.llm.factory import LLMFactory
 from src.core.config import settings
-import platform
+from src.core.cache import ResponseCache
+from src.core.semantic_cache import SemanticCache
+from src.core.executor import CommandExecutor, plan_order
+from src.core.async_runner import AsyncRunner
+from src.core.llm.hedging import Hedger
+from src.core.llm.router import ProviderRouter
+from src.core.llm.budget import TokenBudget, estimate_tokens
+from src.core.llm.rate_limit import RequestScheduler, PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BACKGROUND
+from src.core.llm.coalescing import RequestCoalescer
+from src.core.json_extract import JSONExtractor
+from src.core.prompts import Prompt, PromptCacheStats, command_prompt, summary_prompt
+from src.core.memory import SessionMemory
+from src.core.prefetch import Prefetcher
+from src.core.intents import IntentMatcher
 import json
-from typing import Union, Dict, Any
+import platform
+import asyncio
+import contextvars
+from typing import Union, Dict, Any, Callable, List, Optional
+
+# Id of the request being processed by the current task, for attributing notices
+current_request = contextvars.ContextVar("current_request", default=None)
+# Set for background work (speculative translations, memory summaries); it stays silent and is never recorded
+speculative = contextvars.ContextVar("speculative", default=False)
+# Admission priority at the provider rate limiter; interactive command translations go first
+request_priority = contextvars.ContextVar("request_priority", default=PRIORITY_NORMAL)
+
+class PlanStep(BaseModel):
+    id: str = Field(description="Short unique name of the step")
+    command: str = Field(description="The shell command for this step")
+    depends_on: List[str] = Field(default_factory=list, description="Ids of steps that must succeed first")
 
 class CommandResponse(BaseModel):
     command_nlp: str = Field(description="The natural language description of the command")
     command_shell: str = Field(description="The executable shell command")
     explanation: str = Field(description="Brief explanation of what the command does")
     is_safe: bool = Field(description="Whether the command is safe to execute without confirmation")
+    plan: Optional[List[PlanStep]] = Field(default=None, description="Steps with dependencies; independent ones run in parallel")
 
 class LLMEngine:
-    def __init__(self):
+    def __init__(self, defer_initialize: bool = False):
         self.llm = None
-        self.initialize()
+        self.secondary_llm = None
+        self.runner = AsyncRunner()
+        self.hedger = Hedger(settings.config.hedging)
+        self.router = ProviderRouter(settings.config.routing)
+        self.router.listener = lambda message: self.notify("route", message)
+        self.budget = TokenBudget(settings.config.budget)
+        self.scheduler = RequestScheduler(settings.config.rate_limit)
+        self.prompt_cache = PromptCacheStats()
+        self.coalescer = RequestCoalescer()
+        self.memory = SessionMemory(settings.config.memory, self._summarize)
+        self.prefetcher = Prefetcher(self, settings.config.prefetch)
+        self._speculation = None  # (cache key, asyncio task) of the latest speculative translation
+        # Called with (request_id, kind, message) for per-request notices such as routing and token estimates
+        self.listener: Optional[Callable[[Any, str, str], None]] = None
+        cache_config = settings.config.cache
+        self.cache = ResponseCache(
+            str(settings.config_dir / "response_cache.json"),
+            max_entries=cache_config.max_entries,
+            ttl_seconds=cache_config.ttl_seconds,
+            max_bytes=cache_config.max_bytes
+        )
+        self.semantic_cache = SemanticCache(cache_config.semantic_threshold)
+        self.intents = IntentMatcher()
+        self.executor = CommandExecutor()
+        self.intents.load_file(str(settings.config_dir / settings.config.intents.rules_file))
+        if defer_initialize:
+            self.initialize_async()
+        else:
+            self.initialize()
         
     def initialize(self):
         """Initialize or re-initialize the LLM client"""
@@ -24,8 +81,162 @@ class LLMEngine:
             print(f"LLM Initialization Error: {e}")
             self.llm = None
 
-    def process_query(self, user_input: str, task_type: str = "command") -> Union[CommandResponse, Dict[str, Any], str]:
-        if not self.llm:
+        # Primary first, then any routing fallbacks
+        provider_pool = LLMFactory.provider_pool()
+        pool = [(provider_pool[0][0], self.llm)]
+        for label, config in provider_pool[1:]:
+            try:
+                pool.append((label, LLMFactory.create_llm(config)))
+            except Exception as e:
+                print(f"Routing Provider Initialization Error ({label}): {e}")
+        self.router.set_pool(pool)
+
+        self.secondary_llm = None
+        hedging = settings.config.hedging
+        if hedging.enabled and hedging.secondary:
+            try:
+                self.secondary_llm = LLMFactory.create_llm(hedging.secondary)
+            except Exception as e:
+                print(f"Hedging Provider Initialization Error: {e}")
+
+    def initialize_async(self):
+        """Initialize on the engine thread so provider SDK imports don't block the caller.
+
+        Queries submitted afterwards are scheduled behind it on the same loop, so they see the new clients.
+        """
+        async def _initialize():
+            self.initialize()
+        self.runner.submit("initialize", _initialize())
+
+    def warm_up(self):
+        """Open provider connections in the background so the first query skips the handshake"""
+        async def _warm_up():
+            if self.llm and settings.config.http.warm_up:
+                await LLMFactory.warm_up()
+        self.runner.submit("warm-up", _warm_up())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get engine metrics as a flat name -> value mapping"""
+        metrics = {f"cache.{k}": v for k, v in self.cache.stats().items()}
+        metrics.update({f"semantic.{k}": v for k, v in self.semantic_cache.stats().items()})
+        for provider, conn in LLMFactory.connection_stats().items():
+            metrics.update({f"http.{provider}.{k}": v for k, v in conn.items()})
+        metrics.update({f"hedge.{k}": v for k, v in self.hedger.stats().items()})
+        metrics.update({f"route.{k}": v for k, v in self.router.stats().items()})
+        metrics.update({f"prompt_cache.{k}": v for k, v in self.prompt_cache.stats().items()})
+        metrics.update({f"prefetch.{k}": v for k, v in self.prefetcher.stats().items()})
+        metrics.update({f"intent.{k}": v for k, v in self.intents.stats().items()})
+        metrics.update({f"coalesce.{k}": v for k, v in self.coalescer.stats().items()})
+        metrics.update({f"ratelimit.{k}": v for k, v in self.scheduler.stats().items()})
+        metrics.update({f"memory.{k}": v for k, v in self.memory.stats().items()})
+        return metrics
+
+    def index_history(self, entries):
+        """Seed the near-duplicate cache from successful CommandHistory entries (on the engine thread)"""
+        executor = self.executor
+
+        def make_payload(entry):
+            cmd = entry.get("command") or entry.get("command_shell", "")
+            nlp = entry.get("nlp") or entry.get("command_nlp", "")
+            if not cmd or cmd.endswith("generated"):  # analyst/developer placeholders
+                return None
+            return CommandResponse(
+                command_nlp=nlp,
+                command_shell=cmd,
+                explanation="Reused from command history.",
+                is_safe=executor.get_risk_level(cmd) == "safe"
+            ).dict()
+
+        async def _index():
+            self.semantic_cache.seed(entries, make_payload)
+        self.runner.submit("index-history", _index())
+
+    def notify(self, kind: str, message: str):
+        """Report a notice for the current request to the listener, if any"""
+        if self.listener is not None and not speculative.get():
+            self.listener(current_request.get(), kind, message)
+
+    def _cache_key(self, user_input: str) -> str:
+        config = settings.config.llm
+        return self.cache.make_key(user_input, platform.system(), config.provider, config.model_name)
+
+    @staticmethod
+    def _request_key(user_input: Union[str, Prompt], task_type: str):
+        """Identity of a request for coalescing: same prompt, mode and model"""
+        config = settings.config.llm
+        text = user_input.text() if isinstance(user_input, Prompt) else user_input
+        return (task_type, config.provider, config.model_name, text)
+
+    def process_query(self, user_input: Union[str, Prompt], task_type: str = "command", use_cache: bool = True,
+                      on_token: Optional[Callable[[str], None]] = None) -> Union[CommandResponse, Dict[str, Any], str]:
+        """Blocking wrapper around aprocess_query for callers outside the engine's event loop"""
+        return self.runner.run(self.aprocess_query(user_input, task_type, use_cache, on_token))
+
+    def submit(self, request_id: Any, user_input: Union[str, Prompt], task_type: str = "command",
+               on_token: Optional[Callable[[str], None]] = None, timeout: Optional[float] = None):
+        """Schedule a query on the engine's event loop and return its concurrent Future"""
+        if timeout is None:
+            timeout = settings.config.llm.request_timeout
+        return self.runner.submit(request_id, self._run_request(request_id, user_input, task_type, on_token), timeout)
+
+    async def _run_request(self, request_id: Any, user_input: Union[str, Prompt], task_type: str,
+                           on_token: Optional[Callable[[str], None]]):
+        current_request.set(request_id)
+        return await self.aprocess_query(user_input, task_type, on_token=on_token)
+
+    def speculate(self, request_id: Any, user_input: str):
+        """Translate a command in the background so submitting the same text finds it ready"""
+        return self.runner.submit(request_id, self._speculate(user_input))
+
+    async def _speculate(self, user_input: str) -> Optional[CommandResponse]:
+        speculative.set(True)
+        key = self._cache_key(user_input)
+        if settings.config.cache.enabled and self.cache.peek(key):
+            return None  # already answered; Enter will be served from the cache
+        task = asyncio.ensure_future(self.aprocess_query(user_input, raise_errors=True))
+        self._speculation = (key, task)
+        return await task
+
+    async def _join_speculation(self, user_input: str) -> Optional[CommandResponse]:
+        """Result of a matching speculative translation (waiting for it if still running), else None"""
+        if self._speculation is None or speculative.get():
+            return None
+        key, task = self._speculation
+        if key != self._cache_key(user_input):
+            return None
+        self._speculation = None
+        await asyncio.wait({task})
+        if task.cancelled() or task.exception() is not None:
+            return None
+        self.notify("prefetch", "Using the translation prepared while typing")
+        return task.result()
+
+    def cancel(self, request_id: Any) -> bool:
+        """Cancel an in-flight request submitted via submit()"""
+        return self.runner.cancel(request_id)
+
+    async def aprocess_query(self, user_input: Union[str, Prompt], task_type: str = "command", use_cache: bool = True,
+                             on_token: Optional[Callable[[str], None]] = None,
+                             raise_errors: bool = False) -> Union[CommandResponse, Dict[str, Any], str]:
+        """Run a query; on_token receives partial output for analyst/developer tasks when streaming.
+
+        Analyst and developer queries may be a Prompt (system, context and question sent as separate messages).
+
+        Errors are returned as error responses unless raise_errors is set (used by batch callers that retry).
+        """
+        history = self.memory.messages() if settings.config.memory.enabled else []
+        # A follow-up ("now only the .log ones") means something else after every turn
+        follow_up = task_type == "command" and bool(history) and self.memory.depends_on(user_input)
+        if task_type == "command" and not follow_up:
+            # The local rule index answers even when no provider is configured
+            result = self.match_intent(user_input)
+            if result is not None:
+                self._remember(user_input, task_type, result)
+                return result
+
+        if not self.router.entries:
+            if raise_errors:
+                raise RuntimeError("LLM not configured. Please check settings.")
             if task_type == "command":
                 return CommandResponse(
                     command_nlp=user_input,
@@ -36,15 +247,56 @@ class LLMEngine:
             else:
                 return "LLM not configured."
             
+        if speculative.get():
+            request_priority.set(PRIORITY_BACKGROUND)
+        else:
+            request_priority.set(PRIORITY_INTERACTIVE if task_type == "command" else PRIORITY_NORMAL)
+
         try:
-            if task_type == "analyst":
-                return self._process_analyst(user_input)
-            elif task_type == "developer":
-                return self._process_developer(user_input)
+            if task_type in ("analyst", "developer"):
+                query = user_input.with_history(history) if isinstance(user_input, Prompt) and history else user_input
+                process = self._process_analyst if task_type == "analyst" else self._process_developer
+                result = await self.coalescer.run(self._request_key(query, task_type),
+                                                  lambda tokens: process(query, tokens), on_token)
+                self._remember(user_input, task_type, result)
+                return result
             else:
-                return self._process_command(user_input)
+                result = None if follow_up else await self._join_speculation(user_input)
+                if result is not None:
+                    self._remember(user_input, task_type, result)
+                    return result
+
+                cache_key = None
+                cache_config = settings.config.cache
+                if use_cache and cache_config.enabled and not follow_up:
+                    cache_key = self._cache_key(user_input)
+                    cached = self.cache.get(cache_key)
+                    if cached is not None:
+                        result = CommandResponse(**cached)
+                        self._remember(user_input, task_type, result)
+                        return result
+
+                    if cache_config.semantic:
+                        match = self.semantic_cache.lookup(user_input)
+                        if match is not None:
+                            payload, score, matched = match
+                            self.notify("cache", f"Reusing near-duplicate '{matched}' (similarity {score:.2f})")
+                            result = CommandResponse(**payload)
+                            self._remember(user_input, task_type, result)
+                            return result
+
+                result = await self.coalescer.run(self._request_key(user_input, task_type),
+                                                  lambda _: self._process_command(user_input, history))
+                if cache_key and result.command_shell:
+                    self.cache.put(cache_key, result.dict())
+                    if cache_config.semantic:
+                        self.semantic_cache.add(user_input, result.dict())
+                self._remember(user_input, task_type, result)
+                return result
                 
         except Exception as e:
+            if raise_errors:
+                raise
             if task_type == "command":
                 return CommandResponse(
                     command_nlp=user_input,
@@ -55,60 +307,157 @@ class LLMEngine:
             else:
                 return f"Error: {str(e)}"
 
-    def _process_command(self, user_input: str) -> CommandResponse:
-        system_os = platform.system()
-        prompt = f"""
-        You are a helpful Linux terminal assistant.
-        Convert the user's natural language request into a valid {system_os} shell command.
-        
-        Return ONLY valid JSON matching this schema:
-        {{
-            "command_nlp": "...",
-            "command_shell": "...",
-            "explanation": "...",
-            "is_safe": true/false
-        }}
-        
-        - "is_safe": false if the command deletes files (rm), modifies system settings, kills processes (kill), or is otherwise destructive. True for read-only commands (ls, cat, grep).
-        
-        User request: {user_input}
-        """
-        response = self.llm.invoke(prompt)
-        return self._parse_json_response(response.content)
+    def match_intent(self, user_input: str) -> Optional[CommandResponse]:
+        """Answer from the local rule index without an LLM call, or None to fall through"""
+        if not settings.config.intents.enabled:
+            return None
+        match = self.intents.match(user_input)
+        if match is None:
+            return None
+        command, explanation, rule = match
+        self.notify("intent", f"Matched local rule '{rule}' (no LLM call)")
+        return CommandResponse(
+            command_nlp=user_input,
+            command_shell=command,
+            explanation=explanation,
+            is_safe=self.executor.is_safe(command)
+        )
 
-    def _process_analyst(self, user_input: str) -> Dict[str, Any]:
-        # The user input already contains the context and the system prompt injection from TerminalWidget
-        # We just need to enforce JSON output for the table structure
-        
-        # However, TerminalWidget injects "You are an expert Data Analyst..." into the query string.
-        # Ideally, we should use a system message if the LLM supports it, but here we just append to prompt.
-        
-        response = self.llm.invoke(user_input)
-        content = response.content
-        
-        # Clean up markdown
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-            
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            # Fallback: try to extract JSON array/object if present
-            import re
-            match = re.search(r'(\{.*\}|\[.*\])', content, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group(0))
-                except:
-                    pass
+    def _remember(self, user_input: Union[str, Prompt], task_type: str, result):
+        """Add a successful interactive turn to the session memory"""
+        if not settings.config.memory.enabled or speculative.get():
+            return
+        question = user_input.question if isinstance(user_input, Prompt) else user_input
+        if task_type == "command":
+            if not result.command_shell:
+                return
+            answer = json.dumps(result.dict())
+        elif task_type == "analyst":
+            if isinstance(result, dict) and "error" in result:
+                return
+            answer = json.dumps(result)
+        else:
+            answer = result
+        self.memory.add(question, answer)
+
+    async def _summarize(self, summary: str, turns) -> str:
+        """Fold turns into the running summary (background priority, silent)"""
+        speculative.set(True)
+        request_priority.set(PRIORITY_BACKGROUND)
+        return await self._complete(summary_prompt(summary, turns))
+
+    def reset_memory(self):
+        """Start a new conversation (on the engine thread)"""
+        async def _reset():
+            self.memory.clear()
+        self.runner.submit("memory-reset", _reset())
+
+    async def _process_command(self, user_input: str, history=None) -> CommandResponse:
+        prompt = command_prompt(user_input, history)
+        secondary = None
+        if self.secondary_llm is not None and settings.config.hedging.enabled:
+            secondary = lambda: self._translate(prompt, self.secondary_llm)
+        return await self.hedger.run(lambda: self._translate(prompt), secondary)
+
+    async def _translate(self, prompt: Prompt, llm=None) -> CommandResponse:
+        """One translation attempt; raises unless the reply is a valid CommandResponse"""
+        return self._parse_json_response(await self._complete(prompt, llm=llm))
+
+    async def _complete(self, prompt: Union[str, Prompt], on_token: Optional[Callable[[str], None]] = None,
+                        llm=None) -> str:
+        """Get the full completion text from llm, or from the provider chosen by the router"""
+        if llm is None:
+            if settings.config.budget.enabled:
+                # Fail fast locally instead of after a network round trip
+                model = settings.config.llm.model_name
+                if isinstance(prompt, Prompt):
+                    prompt, report = self.budget.fit_prompt(prompt, model)
+                else:
+                    prompt, report = self.budget.fit(prompt, model)
+                self.notify("budget", TokenBudget.describe(report))
+            streamed = []
+
+            def forward(token: str):
+                streamed.append(True)
+                on_token(token)
+
+            return await self.router.run(
+                lambda name, routed: self._schedule(name, routed, prompt, forward if on_token else None),
+                # Another provider would restart the reply the caller has already partly seen
+                can_failover=lambda: not streamed
+            )
+        return await self._schedule(settings.config.hedging.secondary.provider.lower(), llm, prompt, on_token)
+
+    async def _schedule(self, provider: str, llm, prompt: Union[str, Prompt],
+                        on_token: Optional[Callable[[str], None]] = None) -> str:
+        """_call through the provider's rate limiter, retrying throttling and transient errors"""
+        streamed = []
+
+        def forward(token: str):
+            streamed.append(True)
+            on_token(token)
+
+        tokens = estimate_tokens(prompt.text() if isinstance(prompt, Prompt) else prompt)
+        return await self.scheduler.run(
+            provider,
+            lambda: self._call(llm, prompt, forward if on_token else None),
+            tokens,
+            request_priority.get(),
+            on_retry=lambda message: self.notify("rate", message),
+            # Retrying after partial output would stream the start of the reply twice
+            can_retry=lambda: not streamed
+        )
+
+    async def _call(self, llm, prompt: Union[str, Prompt], on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Invoke one client, streaming tokens to on_token if given"""
+        payload = prompt.messages() if isinstance(prompt, Prompt) else prompt
+        if on_token is None or not settings.config.llm.streaming:
+            response = await llm.ainvoke(payload)
+            self._record_usage(response)
+            return response.content
+
+        parts = []
+        usage_chunk = None
+        async for chunk in llm.astream(payload):
+            if chunk.content:
+                parts.append(chunk.content)
+                on_token(chunk.content)
+            if getattr(chunk, "usage_metadata", None):
+                usage_chunk = chunk
+        self._record_usage(usage_chunk)
+        return "".join(parts)
+
+    def _record_usage(self, message):
+        """Track provider prompt-cache hits reported in a response's usage metadata"""
+        usage = getattr(message, "usage_metadata", None)
+        cached = self.prompt_cache.record(usage)
+        if cached:
+            self.notify("cache", f"Provider prompt cache: {cached:,} of {usage.get('input_tokens', 0):,} prompt tokens reused")
+
+    async def _process_analyst(self, user_input: Union[str, Prompt], on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        # TerminalWidget sends a Prompt whose system message enforces JSON output for the table structure
+        extractor = JSONExtractor()
+
+        def forward(token: str):
+            # Parse as tokens arrive so the result is ready the moment the stream ends
+            extractor.feed(token)
+            on_token(token)
+
+        content = await self._complete(user_input, forward if on_token else None)
+        if extractor.buffer != content:
+            # Not streamed (or routed to a retry): parse the full reply in one pass
+            extractor = JSONExtractor()
+            extractor.feed(content)
+
+        extractor.finish()
+        value = extractor.best()
+        if value is None:
             return {"error": "Could not parse JSON", "raw_content": content}
+        return value
 
-    def _process_developer(self, user_input: str) -> str:
+    async def _process_developer(self, user_input: Union[str, Prompt], on_token: Optional[Callable[[str], None]] = None) -> str:
         # User input has context. Developer mode returns Clean Code.
-        response = self.llm.invoke(user_input)
-        content = response.content
+        content = await self._complete(user_input, on_token)
         
         # Clean up markdown code blocks to return just code
         if "```" in content:
@@ -127,14 +476,22 @@ class LLMEngine:
         return content.strip()
 
     def _parse_json_response(self, content: str) -> CommandResponse:
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].split("```")[0].strip()
-        
-        content = content.strip()
-        data = json.loads(content)
-        return CommandResponse(**data)
+        """First JSON object in content that is a valid CommandResponse; raises ValueError otherwise"""
+        for value in JSONExtractor.extract_all(content):
+            if isinstance(value, dict):
+                try:
+                    response = CommandResponse(**value)
+                except ValidationError:
+                    continue
+                if response.plan is not None:
+                    try:
+                        plan_order(response.plan)
+                    except ValueError as e:
+                        # command_shell still holds the whole task; run that instead
+                        print(f"Ignoring invalid plan: {e}")
+                        response.plan = None
+                return response
+        raise ValueError(f"No valid command JSON in response: {content[:200]!r}")
 
     # Legacy alias
     def generate_command(self, user_input: str) -> CommandResponse:
@@ -1,19 +1,18 @@
 import os
-import cv2
-import pytesseract
-from pdfminer.high_level import extract_text
-from PIL import Image
-from PySide6.QtCore import QObject, Signal, QThread
+from PySide6.QtCore import QObject, Signal
+
+# OCR/PDF/video libraries are imported on first use; most sessions never upload a file
 
 class MediaProcessorWorker(QObject):
-    """Worker thread for processing media files (PDF, Image, Video)"""
+    """Extracts text from media files (PDF, Image, Video); run() executes on a TaskExecutor worker"""
     finished = Signal(str, str)  # content, file_type
     error = Signal(str)
     progress = Signal(str)
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, token=None):
         super().__init__()
         self.file_path = file_path
+        self.token = token  # CancellationToken, checked between video frames
 
     def run(self):
         try:
@@ -45,12 +44,19 @@ class MediaProcessorWorker(QObject):
             self.error.emit(str(e))
 
     def _process_pdf(self, path):
+        from pdfminer.high_level import extract_text
         return extract_text(path)
 
     def _process_image(self, path):
+        import pytesseract
+        from PIL import Image
         return pytesseract.image_to_string(Image.open(path))
 
     def _process_video(self, path):
+        import cv2
+        import pytesseract
+        from PIL import Image
+
         cap = cv2.VideoCapture(path)
         if not cap.isOpened():
             raise Exception("Could not open video file")
@@ -62,6 +68,8 @@ class MediaProcessorWorker(QObject):
         frame_count = 0
         
         while True:
+            if self.token is not None and self.token.cancelled:
+                break
             ret, frame = cap.read()
             if not ret:
                 break
@@ -0,0 +1,130 @@
+import re
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from src.core.llm.budget import estimate_tokens
+
+Message = Tuple[str, str]
+
+# Requests that only make sense against earlier turns ("now only the .log ones", "do it again")
+FOLLOW_UP_RE = re.compile(
+    r"^\s*(now|then|and|also|instead|again|same|but|only|just)\b"
+    r"|\b(it|them|those|these|that one|the ones|same|previous|last one|again|instead)\b",
+    re.IGNORECASE
+)
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text to roughly `tokens` tokens, keeping the start"""
+    estimate = estimate_tokens(text)
+    if estimate <= tokens:
+        return text
+    return text[:max(0, int(len(text) * tokens / estimate) - 3)].rstrip() + "..."
+
+
+class SessionMemory:
+    """Bounded multi-turn memory: recent turns verbatim plus a running summary of older ones.
+
+    When the verbatim turns outgrow their budget the oldest are folded into the summary by a
+    background call to summarizer(summary, turns), so the caller never waits on it. Until that
+    finishes they stay verbatim; if the summarizer is missing or fails, an extractive summary is
+    used instead. Either way the history sent with a prompt stays within a fixed token budget.
+    Runs on the engine's event loop.
+    """
+
+    def __init__(self, config, summarizer: Optional[Callable[[str, List[Message]], Awaitable[str]]] = None):
+        self.config = config
+        self.summarizer = summarizer
+        self.summary = ""
+        self.turns: List[Message] = []  # (question, answer) oldest first
+        self._task: Optional[asyncio.Task] = None
+        self.summarized = 0
+        self.fallbacks = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.summary or self.turns)
+
+    def depends_on(self, text: str) -> bool:
+        """Whether a request reads as a follow-up, so answers cached without this history don't apply"""
+        return bool(self) and FOLLOW_UP_RE.search(text) is not None
+
+    def messages(self) -> List[Message]:
+        """History as chat messages to send between the context and the new question"""
+        messages = []
+        if self.summary:
+            messages.append(("human", f"Summary of our conversation so far: {self.summary}"))
+        for question, answer in self.turns:
+            messages += [("human", question), ("ai", answer)]
+        return messages
+
+    def add(self, question: str, answer: str):
+        """Record a completed turn and fold old turns into the summary if over budget"""
+        self.turns.append((_truncate(question, self.config.turn_tokens), _truncate(answer, self.config.turn_tokens)))
+        due = self._due()
+        if not due:
+            return
+        if self.summarizer is None or len(self.turns) > 2 * self.config.recent_turns:
+            # No summarizer, or it is falling behind: compress locally so the history stays bounded
+            self._fold(self._extract(self.summary, self.turns[:due]), due)
+            self.fallbacks += 1
+        elif self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._summarize(due))
+
+    def _due(self) -> int:
+        """How many of the oldest turns should move into the summary"""
+        due = max(0, len(self.turns) - self.config.recent_turns)
+        while due < len(self.turns) and sum(estimate_tokens(q) + estimate_tokens(a)
+                                            for q, a in self.turns[due:]) > self.config.recent_tokens:
+            due += 1
+        return due
+
+    async def _summarize(self, count: int):
+        batch = self.turns[:count]
+        try:
+            summary = (await self.summarizer(self.summary, batch)).strip()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Memory summarization failed: {e}")
+            summary = ""
+        if not summary:
+            summary = self._extract(self.summary, batch)
+            self.fallbacks += 1
+        if self.turns[:count] != batch:
+            return  # cleared meanwhile
+        self._fold(summary, count)
+        self.summarized += 1
+        # Turns added while this call was running may already be due
+        due = self._due()
+        if due:
+            self._task = asyncio.ensure_future(self._summarize(due))
+
+    def _fold(self, summary: str, count: int):
+        self.summary = _truncate(summary, self.config.summary_tokens)
+        del self.turns[:count]
+
+    def _extract(self, summary: str, turns: List[Message]) -> str:
+        """Local fallback: earlier summary plus one clipped line per turn, newest kept on overflow"""
+        lines = [summary] if summary else []
+        lines += [f"{_truncate(q, 30)} -> {_truncate(a, 30)}" for q, a in turns]
+        text = " | ".join(lines)
+        while estimate_tokens(text) > self.config.summary_tokens and len(lines) > 1:
+            lines.pop(0)
+            text = " | ".join(lines)
+        return text
+
+    def clear(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.summary = ""
+        self.turns = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "turns": len(self.turns),
+            "summary_tokens": estimate_tokens(self.summary) if self.summary else 0,
+            "history_tokens": sum(estimate_tokens(content) for _, content in self.messages()),
+            "summarized": self.summarized,
+            "fallbacks": self.fallbacks,
+        }
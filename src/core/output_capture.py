@@ -0,0 +1,130 @@
+import os
+import codecs
+import tempfile
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+BINARY_SAMPLE = 4096
+TEXT_CONTROLS = set("\n\r\t\f\b\x1b")
+
+
+def looks_binary(text: str) -> bool:
+    """Heuristic on decoded output: NUL bytes or many undecodable/control characters"""
+    sample = text[:BINARY_SAMPLE]
+    if "\x00" in sample:
+        return True
+    if len(sample) < 32:
+        return False
+    bad = sum(1 for c in sample if c == "\ufffd" or (c < " " and c not in TEXT_CONTROLS))
+    return bad / len(sample) > 0.1
+
+
+class OutputCapture:
+    """Bounded record of one command's output.
+
+    The first display_chars are passed through for display; after that only a ring buffer of the
+    last tail_chars stays in memory. Output beyond memory_chars is spilled (from the start) to a
+    temp file that read() pages through lazily. Binary output is never displayed. Memory use is
+    therefore flat however much a command prints. feed() runs on the reader thread.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.total = 0  # characters seen
+        self.shown = 0
+        self.shown_bytes = 0  # UTF-8 offset where undisplayed output starts (for read())
+        self.binary = False
+        self.path: Optional[str] = None
+        self._memory: List[str] = []  # everything, until it spills
+        self._ring = deque()
+        self._ring_size = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def feed(self, text: str) -> str:
+        """Record text and return the part of it to display now ("" once over the display cap)"""
+        with self._lock:
+            if not self.binary and (self.total == 0 and looks_binary(text) or "\x00" in text):
+                self.binary = True
+            self.total += len(text)
+            self._store(text)
+            self._remember(text)
+            if self.binary:
+                return ""
+            part = text[:max(0, self.config.display_chars - self.shown)]
+            self.shown += len(part)
+            self.shown_bytes += len(part.encode("utf-8"))
+            return part
+
+    def _store(self, text: str):
+        if self._file is None and self.total <= self.config.memory_chars:
+            self._memory.append(text)
+            return
+        if self._file is None:
+            fd, self.path = tempfile.mkstemp(prefix="promptshell-output-", suffix=".log")
+            self._file = os.fdopen(fd, "wb")
+            self._file.write("".join(self._memory).encode("utf-8"))
+            self._memory = []
+        self._file.write(text.encode("utf-8"))
+
+    def _remember(self, text: str):
+        limit = self.config.tail_chars
+        if len(text) >= limit:
+            self._ring.clear()
+            self._ring.append(text[-limit:])
+            self._ring_size = limit
+            return
+        self._ring.append(text)
+        self._ring_size += len(text)
+        while self._ring_size - len(self._ring[0]) >= limit:
+            self._ring_size -= len(self._ring.popleft())
+
+    @property
+    def truncated(self) -> bool:
+        return not self.binary and self.total > self.shown
+
+    def tail(self) -> str:
+        """The most recent output that was not displayed (at most tail_chars)"""
+        with self._lock:
+            text = "".join(self._ring)
+            # The ring holds whole chunks, so it can run past tail_chars; it may also hold shown text
+            keep = min(self.total - self.shown, self.config.tail_chars)
+            return text[len(text) - keep:] if keep > 0 else ""
+
+    def read(self, offset: int, size: int) -> Tuple[str, int]:
+        """Up to size bytes of the full output from byte offset; returns (text, next offset)"""
+        with self._lock:
+            if self.path is None:
+                data = "".join(self._memory).encode("utf-8")[offset:offset + size]
+            else:
+                if self._file is not None:
+                    self._file.flush()
+                with open(self.path, "rb") as f:
+                    f.seek(offset)
+                    data = f.read(size)
+        # Leave a character split at the end of the page for the next read
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        text = decoder.decode(data, final=len(data) < size)
+        return text, offset + len(data) - len(decoder.getstate()[0])
+
+    def close(self):
+        """Stop writing; the spill file stays readable until discard()"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        self.close()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+    def size(self) -> int:
+        if self.path and os.path.exists(self.path):
+            return os.path.getsize(self.path)
+        return sum(len(t.encode("utf-8")) for t in self._memory)
@@ -0,0 +1,81 @@
+import time
+import itertools
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+from src.core.config import settings
+
+PREFETCH_ID = "prefetch"  # prefix; each speculation gets its own id so cancel() always reaches it
+
+
+class Prefetcher:
+    """Speculatively translates the input line while the user pauses typing.
+
+    At most one speculation runs at a time; a newer input cancels the stale one. The number of
+    speculative LLM calls is capped per rolling minute. Called from the GUI thread.
+    """
+
+    def __init__(self, engine, config):
+        self.engine = engine
+        self.config = config
+        self.current: Optional[Tuple[str, str, Future]] = None  # (text, request id, future)
+        self._ids = itertools.count(1)
+        self._starts = deque()  # monotonic start times within the last minute
+        self.issued = 0
+        self.used = 0
+        self.cancelled = 0
+        self.capped = 0
+
+    def request(self, text: str) -> bool:
+        """Start translating text in the background; returns True if a speculation was issued"""
+        text = text.strip()
+        if self.current is not None and self.current[0] == text:
+            return False
+        self.cancel()
+        if not self.config.enabled or len(text) < self.config.min_chars:
+            return False
+        if settings.config.memory.enabled and self.engine.memory.depends_on(text):
+            return False  # follow-ups bypass speculation; the answer depends on the turn before
+        if settings.config.intents.enabled and self.engine.intents.match(text, record=False) is not None:
+            return False  # the local fast path answers it instantly anyway
+
+        now = time.monotonic()
+        while self._starts and now - self._starts[0] > 60:
+            self._starts.popleft()
+        if len(self._starts) >= self.config.max_per_minute:
+            self.capped += 1
+            return False
+
+        self._starts.append(now)
+        # Cached answers are skipped on the engine loop (ResponseCache.peek), not probed from this thread
+        request_id = f"{PREFETCH_ID}-{next(self._ids)}"
+        self.current = (text, request_id, self.engine.speculate(request_id, text))
+        self.issued += 1
+        return True
+
+    def claim(self, text: str) -> bool:
+        """Hand a matching speculation over to a submitted request; cancel it if the text differs"""
+        if self.current is not None and self.current[0] == text.strip():
+            self.current = None
+            self.used += 1
+            return True
+        self.cancel()
+        return False
+
+    def cancel(self):
+        """Cancel the in-flight speculation, if any"""
+        if self.current is not None:
+            _, request_id, future = self.current
+            if not future.done():
+                self.engine.cancel(request_id)
+                self.cancelled += 1
+            self.current = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "issued": self.issued,
+            "used": self.used,
+            "cancelled": self.cancelled,
+            "capped": self.capped,
+            "hit_rate": self.used / self.issued if self.issued else 0.0,
+        }
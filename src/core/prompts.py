@@ -0,0 +1,109 @@
+import platform
+from typing import Any, Dict, List, Optional, Tuple
+
+# System prompts are module constants so every request starts with byte-identical text,
+# which is what provider-side prompt caching (OpenAI, Gemini, OpenRouter) keys on.
+COMMAND_SYSTEM_PROMPT = f"""You are a helpful Linux terminal assistant.
+Convert the user's natural language request into a valid {platform.system()} shell command.
+
+Return ONLY valid JSON matching this schema:
+{{
+    "command_nlp": "...",
+    "command_shell": "...",
+    "explanation": "...",
+    "is_safe": true/false
+}}
+
+- "is_safe": false if the command deletes files (rm), modifies system settings, kills processes (kill), or is otherwise destructive. True for read-only commands (ls, cat, grep).
+- For tasks with several separate parts (e.g. build, test and package three services) also add
+  "plan": [{{"id": "build_api", "command": "...", "depends_on": []}}, ...]. Steps that do not depend
+  on each other run in parallel. "command_shell" must still perform the whole task on its own."""
+
+ANALYST_SYSTEM_PROMPT = (
+    "You are an expert Data Analyst. "
+    "Your task is to extract information from the provided context based on the user's request. "
+    "Return the result ONLY as a valid JSON object. "
+    "If the requested information is not found, return null values in the JSON. "
+    "Do not include any conversational text, markdown formatting, or explanations outside the JSON."
+)
+
+DEVELOPER_SYSTEM_PROMPT = "You are an expert Senior Developer."
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a terminal assistant session. "
+    "Merge the earlier summary with the new exchanges into one short paragraph (at most 120 words). "
+    "Keep what later requests may refer to: directories, file names and patterns, commands run, "
+    "data extracted, and the user's preferences. Reply with the summary only."
+)
+
+
+class Prompt:
+    """A request split into system instructions, document context, conversation history and the question.
+
+    Messages are ordered most-stable first so consecutive requests share the longest possible prefix:
+    the system prompt never changes, the context only changes with the document and the history
+    only grows at its end between summaries.
+    """
+
+    def __init__(self, system: str, question: str, context: str = "",
+                 history: Optional[List[Tuple[str, str]]] = None):
+        self.system = system
+        self.question = question
+        self.context = context
+        self.history = history or []
+
+    def messages(self) -> List[Tuple[str, str]]:
+        """(role, content) pairs accepted by LangChain chat models"""
+        messages = [("system", self.system)]
+        if self.context:
+            messages.append(("human", f"Context Content:\n{self.context}"))
+        messages += self.history
+        messages.append(("human", f"User Question: {self.question}" if self.context else self.question))
+        return messages
+
+    def text(self) -> str:
+        """The whole prompt as one string (for token estimates and logging)"""
+        return "\n\n".join(content for _, content in self.messages())
+
+    def with_context(self, context: str) -> "Prompt":
+        return Prompt(self.system, self.question, context, self.history)
+
+    def with_history(self, history: List[Tuple[str, str]]) -> "Prompt":
+        return Prompt(self.system, self.question, self.context, history)
+
+
+def command_prompt(user_input: str, history: Optional[List[Tuple[str, str]]] = None) -> Prompt:
+    return Prompt(COMMAND_SYSTEM_PROMPT, f"User request: {user_input}", history=history)
+
+
+def summary_prompt(summary: str, turns: List[Tuple[str, str]]) -> Prompt:
+    exchanges = "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+    return Prompt(SUMMARY_SYSTEM_PROMPT, f"Earlier summary: {summary or '(none)'}\n\nNew exchanges:\n{exchanges}")
+
+
+class PromptCacheStats:
+    """Prompt tokens the providers report as served from their prompt cache"""
+
+    def __init__(self):
+        self.responses = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage: Optional[dict]) -> int:
+        """Add one response's LangChain usage metadata; returns its cached token count"""
+        if not usage:
+            return 0
+        details = usage.get("input_token_details") or {}
+        cached = int(details.get("cache_read") or 0)
+        self.responses += 1
+        self.prompt_tokens += int(usage.get("input_tokens") or 0)
+        self.cached_tokens += cached
+        return cached
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "responses": self.responses,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "hit_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+        }
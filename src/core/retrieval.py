@@ -0,0 +1,105 @@
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+what which who whom how when where why do does did can could should would i you we they he she me my our
+your their them there here all any about into than then so if not no yes
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens without stopwords"""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class Chunk:
+    """A slice of an uploaded document"""
+    __slots__ = ("source", "index", "start", "text")
+
+    def __init__(self, source: str, index: int, start: int, text: str):
+        self.source = source
+        self.index = index
+        self.start = start
+        self.text = text
+
+    @property
+    def citation(self) -> str:
+        return f"{self.source}#{self.index + 1}"
+
+
+class DocumentIndex:
+    """BM25 lexical index over chunked document text"""
+
+    def __init__(self, chunks: List[Chunk], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+
+        for i, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk.text))
+            self.lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((i, tf))
+
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    @classmethod
+    def build(cls, documents: List[Tuple[str, str]], chunk_size: int = 1200, overlap: int = 200) -> "DocumentIndex":
+        """Chunk (source, text) documents on paragraph/line boundaries and index them"""
+        chunks = []
+        step = max(chunk_size - overlap, 1)
+        for source, text in documents:
+            start = 0
+            index = 0
+            while start < len(text):
+                end = min(start + chunk_size, len(text))
+                if end < len(text):
+                    # Prefer to break at a paragraph or line boundary inside the window
+                    cut = text.rfind("\n\n", start + step // 2, end)
+                    if cut == -1:
+                        cut = text.rfind("\n", start + step // 2, end)
+                    if cut > start:
+                        end = cut
+                piece = text[start:end].strip()
+                if piece:
+                    chunks.append(Chunk(source, index, start, piece))
+                    index += 1
+                if end >= len(text):
+                    break
+                start = max(end - overlap, start + 1)
+        return cls(chunks)
+
+    def search(self, query: str, k: int = 6) -> List[Tuple[Chunk, float]]:
+        """Top-k chunks by BM25 score for query"""
+        return [(self.chunks[i], score) for i, score in self._rank(query, k)]
+
+    def _rank(self, query: str, k: int) -> List[Tuple[int, float]]:
+        n = len(self.chunks)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for i, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def select(self, query: str, k: int = 6) -> List[Chunk]:
+        """Relevant chunks in document order, falling back to the leading chunks on no match"""
+        positions = sorted(i for i, _ in self._rank(query, k)) or range(min(k, len(self.chunks)))
+        return [self.chunks[i] for i in positions]
+
+    @staticmethod
+    def format_context(chunks: List[Chunk]) -> str:
+        """Render chunks with citation headers for the prompt"""
+        return "\n\n".join(f"[{chunk.citation}]\n{chunk.text}" for chunk in chunks)
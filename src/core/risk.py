@@ -0,0 +1,299 @@
+import re
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional
+
+RISK_ORDER = {"safe": 0, "risky": 1, "dangerous": 2}
+CACHE_SIZE = 4096
+
+
+class Verdict(NamedTuple):
+    level: str  # safe, risky or dangerous
+    reason: str = ""
+
+
+SAFE = Verdict("safe")
+
+SEPARATORS = {";", "&&", "||", "|", "|&", "&", "(", ")", "{", "}", "\n", "!"}
+REDIRECTS = {">", ">>", ">|", "&>", "&>>", ">&", "<", "<<", "<<<", "<>", "<&"}
+SHELLS = {"sh", "bash", "zsh", "dash", "ksh", "fish"}
+INTERPRETERS = SHELLS | {"python", "python3", "perl", "ruby", "node", "php"}
+# Wrappers that run the rest of the line as a command, with the options that take a value
+WRAPPERS = {
+    "sudo": {"-u", "-g", "-h", "-p", "-C", "-U", "-r", "-t", "-D"},
+    "doas": {"-u", "-C"},
+    "env": {"-u", "-C", "-S"},
+    "nohup": set(),
+    "time": {"-f", "-o"},
+    "nice": {"-n"},
+    "ionice": {"-c", "-n", "-p"},
+    "command": set(),
+    "exec": {"-a"},
+    "builtin": set(),
+    "stdbuf": {"-i", "-o", "-e"},
+    "timeout": {"-s", "-k"},
+    "watch": {"-n", "-d"},
+    "xargs": {"-I", "-n", "-P", "-L", "-d", "-E", "-s", "-a"},
+}
+ELEVATED = {"sudo", "doas", "su"}
+DISK_FORMATTERS = {"mkfs", "mke2fs", "mkswap", "fdisk", "sfdisk", "parted", "wipefs"}
+DOWNLOADERS = {"curl", "wget"}
+
+# Top-level system directories; deleting or re-permissioning them recursively wrecks the machine
+SYSTEM_DIRS = {"/bin", "/boot", "/dev", "/etc", "/home", "/lib", "/lib64", "/opt", "/proc", "/root",
+               "/sbin", "/srv", "/sys", "/usr", "/var"}
+HOME_DIRS = {"~", "$HOME", "${HOME}"}
+URL_RE = re.compile(r"^(https?|ftp)://|^[\w.-]+\.[a-z]{2,}(/|$)", re.IGNORECASE)
+DISK_DEVICE_RE = re.compile(r"^/dev/(sd|hd|vd|xvd|nvme|mmcblk|disk|md|dm-)")
+FORK_BOMB_RE = re.compile(r"(\S+)\s*\(\)\s*\{[^}]*\1\s*\|\s*\1\s*&")
+SUBSTITUTION_RE = re.compile(r"\$\(([^()]*)\)|`([^`]*)`|<\(([^()]*)\)")
+
+# Every command name with a rule, wrapper or nested shell, plus the redirect and substitution
+# syntax, as one alternation compiled once: lines without a match (and without quoting, which
+# could hide a command name such as r'm') skip tokenizing altogether.
+TRIGGER_RE = re.compile(
+    r"(?<![\w.-])(?:" + "|".join(sorted(map(re.escape, {
+        "rm", "mv", "dd", "chmod", "chown", "chgrp", "find", "shred", "eval", "su", "mkfs"
+    } | DISK_FORMATTERS | DOWNLOADERS | set(WRAPPERS) | SHELLS), key=len, reverse=True)) + r")(?![\w-])"
+    r"|>|`|\$\(|<\(|\(\)"
+)
+
+
+# Shell words (with their quoting) and operators in one pass of a compiled pattern
+TOKEN_RE = re.compile(r"""
+    [ \t\r]*(?:
+      (?P<op>&&|\|\||\|&|&>>|&>|>>|>\||>&|<<<|<<|<>|<&|[;&|()<>\n])
+    | (?P<word>(?:[^\s;&|()<>'"\\]|\\.|'[^']*'|"(?:[^"\\]|\\.)*")+)
+    )""", re.VERBOSE | re.DOTALL)
+QUOTED_RE = re.compile(r"""['"\\]""")
+QUOTING_RE = re.compile(r"""'([^']*)'|"((?:[^"\\]|\\.)*)"|\\(.)""", re.DOTALL)
+
+
+def _unquote(match) -> str:
+    single, double, escaped = match.groups()
+    if single is not None:
+        return single
+    if double is not None:
+        return re.sub(r"\\(.)", r"\1", double)
+    return escaped
+
+
+def _tokens(command: str) -> List[str]:
+    tokens = []
+    pos, end = 0, len(command.rstrip(" \t\r"))
+    while pos < end:
+        match = TOKEN_RE.match(command, pos)
+        if match is None:  # unbalanced quotes, e.g. while the line is still being typed
+            return tokens + command[pos:].split()
+        op, word = match.group("op", "word")
+        if op is not None:
+            tokens.append(op)
+        elif "'" in word or '"' in word or "\\" in word:
+            tokens.append(QUOTING_RE.sub(_unquote, word))
+        elif word.startswith("#"):
+            break  # comment
+        else:
+            tokens.append(word)
+        pos = match.end()
+    return tokens
+
+
+def _commands(tokens: List[str]) -> Iterator[tuple]:
+    """Split tokens into (argv, redirect targets, next command in the pipeline or None)"""
+    argv, targets = [], []
+    simple = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in SEPARATORS:
+            simple.append((argv, targets, token))
+            argv, targets = [], []
+        elif token in REDIRECTS:
+            if argv and argv[-1].isdigit():
+                argv.pop()  # the fd in 2>file
+            if i + 1 < len(tokens) and tokens[i + 1] not in SEPARATORS:
+                if token.startswith(">") or token.startswith("&>"):
+                    targets.append(tokens[i + 1])
+                i += 1
+        else:
+            argv.append(token)
+        i += 1
+    simple.append((argv, targets, None))
+    for index, (argv, targets, separator) in enumerate(simple):
+        piped = None
+        if separator in ("|", "|&") and index + 1 < len(simple):
+            piped = simple[index + 1][0]
+        if argv or targets:
+            yield argv, targets, piped
+
+
+def _name(word: str) -> str:
+    return word.rsplit("/", 1)[-1]
+
+
+def _unwrap(argv: List[str]):
+    """Strip variable assignments and wrappers (sudo, env, xargs, ...); returns (argv, elevated, via xargs)"""
+    elevated = xargs = False
+    i = 0
+    while i < len(argv):
+        word = argv[i]
+        name = _name(word)
+        if re.match(r"^\w+=", word):
+            i += 1
+        elif name in WRAPPERS:
+            elevated |= name in ELEVATED
+            xargs |= name == "xargs"
+            i += 1
+            takes_value = WRAPPERS[name]
+            while i < len(argv) and (argv[i].startswith("-") or re.match(r"^\w+=", argv[i])):
+                i += 2 if argv[i] in takes_value else 1
+            if name == "timeout" and i < len(argv):
+                i += 1  # the duration
+        else:
+            break
+    return argv[i:], elevated, xargs
+
+
+def _flags(args: List[str]) -> tuple:
+    """Short flag letters, long options and operands of an argument list"""
+    letters, long, operands = set(), set(), []
+    options = True
+    for arg in args:
+        if options and arg == "--":
+            options = False
+        elif options and arg.startswith("--"):
+            long.add(arg)
+        elif options and arg.startswith("-") and len(arg) > 1:
+            letters.update(arg[1:])
+        else:
+            operands.append(arg)
+    return letters, long, operands
+
+
+def _critical(path: str) -> Optional[str]:
+    """'root', 'home' or 'system' if path is (everything in) one of those directories"""
+    trimmed = path.rstrip("*").rstrip("/") or ("/" if path.startswith("/") else "")
+    if trimmed in ("/", "/."):
+        return "root"
+    if trimmed in HOME_DIRS:
+        return "home"
+    if trimmed in SYSTEM_DIRS:
+        return "system"
+    return None
+
+
+def _worse(a: Verdict, b: Verdict) -> Verdict:
+    return b if RISK_ORDER[b.level] > RISK_ORDER[a.level] else a
+
+
+def _rm(args: List[str]) -> Verdict:
+    letters, long, operands = _flags(args)
+    if "--no-preserve-root" in long:
+        return Verdict("dangerous", "This command will delete all files on your system!")
+    recursive = bool(letters & {"r", "R"}) or "--recursive" in long
+    targets = [_critical(path) for path in operands]
+    if recursive and "root" in targets:
+        return Verdict("dangerous", "This command will delete all files on your system!")
+    if recursive and ("home" in targets or "system" in targets):
+        return Verdict("dangerous", "This command will delete a system or home directory.")
+    if recursive:
+        return Verdict("risky", "This command will recursively delete files. Make sure you specify the correct path.")
+    if any(targets):
+        return Verdict("risky", "This command deletes files in a system directory.")
+    return SAFE
+
+
+def _permissions(name: str, args: List[str]) -> Verdict:
+    letters, long, operands = _flags(args)
+    recursive = "R" in letters or "--recursive" in long
+    critical = any(_critical(path) for path in operands)
+    if name == "chmod" and recursive and "777" in operands:
+        level = "dangerous" if critical else "risky"
+        return Verdict(level, "This command will make all files world-writable, which is a security risk.")
+    if recursive and critical:
+        return Verdict("dangerous", "This command changes ownership or permissions of a whole system directory.")
+    if recursive:
+        return Verdict("risky", "This command recursively changes ownership or permissions.")
+    if critical:
+        return Verdict("risky", "This command changes ownership or permissions of a system directory.")
+    return SAFE
+
+
+def _classify_argv(argv: List[str], targets: List[str], piped: Optional[List[str]]) -> Verdict:
+    verdict = SAFE
+    for target in targets:
+        if DISK_DEVICE_RE.match(target):
+            verdict = _worse(verdict, Verdict("dangerous", "This command writes directly to a disk device."))
+        elif _critical(target) or any(target.startswith(d + "/") for d in SYSTEM_DIRS - {"/dev", "/home"}):
+            verdict = _worse(verdict, Verdict("risky", "This command overwrites a system file."))
+
+    argv, elevated, xargs = _unwrap(argv)
+    if elevated:
+        verdict = _worse(verdict, Verdict("risky", "This command runs with administrator privileges. Verify it's correct."))
+    if not argv:
+        return verdict
+    name, args = _name(argv[0]), argv[1:]
+
+    if name == "rm":
+        found = _rm(args)
+        if xargs and found.level == "safe":
+            found = Verdict("risky", "This command deletes every file passed to it.")
+    elif name in ("chmod", "chown", "chgrp"):
+        found = _permissions(name, args)
+    elif name in DISK_FORMATTERS or name.startswith("mkfs."):
+        found = Verdict("dangerous", "This command will format a disk, destroying all data on it.")
+    elif name == "dd":
+        if any(arg.startswith("of=") and DISK_DEVICE_RE.match(arg[3:]) for arg in args):
+            found = Verdict("dangerous", "This command overwrites a disk device. Double-check the parameters.")
+        else:
+            found = Verdict("risky", "This command can overwrite disk data. Double-check the parameters.")
+    elif name == "mv":
+        found = SAFE
+        if any(_critical(path) for path in _flags(args)[2]):
+            found = Verdict("risky", "This command moves a system or home directory.")
+    elif name == "shred":
+        found = Verdict("risky", "This command irrecoverably overwrites files.")
+    elif name == "find":
+        found = SAFE
+        if "-delete" in args:
+            found = Verdict("risky", "This command deletes every file it finds.")
+        for flag in ("-exec", "-execdir", "-ok", "-okdir"):
+            if flag in args:
+                start = args.index(flag) + 1
+                end = next((i for i in range(start, len(args)) if args[i] in (";", "+")), len(args))
+                found = _worse(found, _classify_argv(args[start:end], [], None))
+    elif name in DOWNLOADERS:
+        found = SAFE
+        if any(URL_RE.match(arg) for arg in _flags(args)[2]):
+            found = Verdict("risky", "This command downloads from the network.")
+            consumer = _unwrap(piped)[0] if piped else []
+            if consumer and _name(consumer[0]) in INTERPRETERS:
+                found = Verdict("dangerous", "This command runs a script downloaded from the network.")
+    elif name in SHELLS or name == "su":
+        found = classify(args[args.index("-c") + 1]) if "-c" in args[:-1] else SAFE
+        if name == "su":
+            found = _worse(Verdict("risky", "This command runs as another user. Verify it's correct."), found)
+    elif name == "eval":
+        found = classify(" ".join(args))
+    else:
+        found = SAFE
+    return _worse(verdict, found)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def classify(command: str) -> Verdict:
+    """Risk of a shell command line, from its parsed simple commands rather than substrings.
+
+    Looks through pipelines, lists, subshells, command substitutions, `sh -c`/`eval` strings,
+    wrappers such as sudo, env and xargs, and output redirects. Cached, since the same line is
+    checked again on every keystroke and before it runs.
+    """
+    if not TRIGGER_RE.search(command) and not QUOTED_RE.search(command):
+        return SAFE
+    verdict = SAFE
+    if FORK_BOMB_RE.search(command):
+        verdict = Verdict("dangerous", "This command is a fork bomb and will freeze the system.")
+    for match in SUBSTITUTION_RE.finditer(command):
+        verdict = _worse(verdict, classify(next(group for group in match.groups() if group is not None)))
+    for argv, targets, piped in _commands(_tokens(command)):
+        verdict = _worse(verdict, _classify_argv(argv, targets, piped))
+    return verdict
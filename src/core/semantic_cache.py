@@ -0,0 +1,183 @@
+import re
+import zlib
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+# NumPy is imported on first add/lookup to keep engine import cheap
+if TYPE_CHECKING:
+    import numpy as np
+
+WORD_RE = re.compile(r"[a-z0-9_./-]+")
+
+STOPWORDS = frozenset("""
+a an the in on at of for per to from with by this that these those me my i please can you could would
+all any some there current now
+""".split())
+
+# Collapse common phrasing variants of shell requests onto one token
+SYNONYMS = {
+    "list": "show", "display": "show", "print": "show", "view": "show", "get": "show", "see": "show",
+    "find": "search", "locate": "search", "look": "search",
+    "big": "large", "biggest": "large", "largest": "large", "huge": "large", "larger": "large",
+    "small": "little", "smallest": "little", "tiny": "little", "smaller": "little",
+    "dir": "directory", "dirs": "directory", "folder": "directory", "folders": "directory",
+    "directories": "directory", "cwd": "directory", "pwd": "directory", "here": "directory",
+    "delete": "remove", "erase": "remove", "rm": "remove",
+    "disk": "storage", "space": "storage", "du": "storage", "df": "storage",
+    "process": "proc", "processes": "proc", "running": "proc", "ps": "proc",
+    "count": "number", "many": "number",
+    "recent": "new", "newest": "new", "latest": "new", "modified": "changed", "edited": "changed",
+}
+
+# Numbers, paths and file names change the command; they must match exactly
+LITERAL_RE = re.compile(r"\d+[a-z]*|[\w-]*[./][\w./-]+")
+
+
+def _stem(word: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_terms(text: str) -> List[str]:
+    """Stopword-free, synonym-collapsed, stemmed terms"""
+    terms = []
+    for word in WORD_RE.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        word = SYNONYMS.get(word, word)
+        terms.append(_stem(word))
+    return terms
+
+
+class HashingVectorizer:
+    """Offline feature hashing of word unigrams, bigrams and character trigrams"""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def features(self, text: str) -> List[str]:
+        terms = normalize_terms(text)
+        feats = [f"w:{t}" for t in terms]
+        feats += [f"b:{a}_{b}" for a, b in zip(terms, terms[1:])]
+        for term in terms:
+            padded = f" {term} "
+            feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return feats
+
+    def transform(self, text: str) -> "np.ndarray":
+        """Signed hashed term-frequency vector (log-scaled)"""
+        import numpy as np
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feat in self.features(text):
+            h = zlib.crc32(feat.encode("utf-8"))
+            vec[h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        return np.sign(vec) * np.log1p(np.abs(vec))
+
+
+class SemanticCache:
+    """Near-duplicate lookup over past translations using TF-IDF weighted cosine similarity"""
+
+    def __init__(self, threshold: float = 0.82, dim: int = 1024, max_entries: int = 2000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.vectorizer = HashingVectorizer(dim)
+        self.texts: List[str] = []
+        self.literals: List[frozenset] = []
+        self.payloads: List[Dict[str, Any]] = []
+        self.rows: List["np.ndarray"] = []
+        self.doc_freq: Optional["np.ndarray"] = None
+        self.hits = 0
+        self.misses = 0
+
+        self._matrix: Optional["np.ndarray"] = None  # idf-weighted, row-normalized; rebuilt lazily
+        self._idf: Optional["np.ndarray"] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _literals(text: str) -> frozenset:
+        return frozenset(LITERAL_RE.findall(text.lower()))
+
+    def add(self, text: str, payload: Dict[str, Any]):
+        """Index a request and its CommandResponse payload (updating an identical request in place)"""
+        key = " ".join(normalize_terms(text))
+        if not key:
+            return
+        with self._lock:
+            if key in self.texts:
+                self.payloads[self.texts.index(key)] = payload
+                return
+            if len(self.texts) >= self.max_entries:
+                self._drop_oldest()
+
+            row = self.vectorizer.transform(text)
+            self.texts.append(key)
+            self.literals.append(self._literals(text))
+            self.payloads.append(payload)
+            self.rows.append(row)
+            if self.doc_freq is None:
+                self.doc_freq = (row != 0).astype(row.dtype)
+            else:
+                self.doc_freq += row != 0
+            self._matrix = None
+
+    def seed(self, entries: List[Dict[str, Any]], make_payload):
+        """Index successful history entries; make_payload(entry) builds the cached response or None"""
+        for entry in reversed(entries):
+            nlp = entry.get("nlp") or entry.get("command_nlp", "")
+            if nlp and entry.get("success", True):
+                payload = make_payload(entry)
+                if payload:
+                    self.add(nlp, payload)
+
+    def _drop_oldest(self):
+        self.doc_freq -= self.rows[0] != 0
+        for items in (self.texts, self.literals, self.payloads, self.rows):
+            items.pop(0)
+        self._matrix = None
+
+    def _weighted(self):
+        import numpy as np
+        if self._matrix is None:
+            n = len(self.rows)
+            self._idf = (np.log((1 + n) / (1 + self.doc_freq)) + 1).astype(np.float32)
+            matrix = np.vstack(self.rows) * self._idf
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._matrix = matrix / np.maximum(norms, 1e-9)
+        return self._matrix, self._idf
+
+    def lookup(self, text: str) -> Optional[Tuple[Dict[str, Any], float, str]]:
+        """Return (payload, similarity, matched text) above the threshold, else None"""
+        with self._lock:
+            if not self.rows:
+                self.misses += 1
+                return None
+            import numpy as np
+            matrix, idf = self._weighted()
+            query = self.vectorizer.transform(text) * idf
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                self.misses += 1
+                return None
+
+            scores = matrix @ (query / norm)
+            literals = self._literals(text)
+            for i in np.argsort(scores)[::-1][:5]:
+                if scores[i] < self.threshold:
+                    break
+                if self.literals[i] == literals:
+                    self.hits += 1
+                    return self.payloads[i], float(scores[i]), self.texts[i]
+
+            self.misses += 1
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.rows),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,278 @@
+import os
+import re
+import time
+import uuid
+import shlex
+import codecs
+import select
+import shutil
+import signal
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.core.executor import CommandProcess
+
+try:
+    import pty
+except ImportError:  # Windows: commands fall back to one process each
+    pty = None
+
+# Colour and cursor control sequences; output is shown as plain text
+ANSI_RE = re.compile(r"\x1b\[[0-?]*[ -/]*[@-~]|\x1b\][^\x07]*\x07|\x1b[()][A-Z0-9]")
+
+SESSION_ENV = {"TERM": "dumb", "PAGER": "cat", "GIT_PAGER": "cat", "PS1": "", "PS2": "", "HISTFILE": os.devnull}
+# No echo or CR translation, no prompts, no `!` history expansion
+SESSION_SETUP = b"stty -echo -onlcr 2>/dev/null; set +H 2>/dev/null; PS1=''; PS2=''; PROMPT_COMMAND=''\n"
+
+
+class ShellSession:
+    """A long-lived shell on a pseudo-terminal that keeps cd, exports and activated virtualenvs.
+
+    Each command is written as `eval '<command>' </dev/null` followed by a printf of a random
+    sentinel with the exit code and working directory, so the reader knows where the output ends.
+    Commands in one session run one at a time. The shell is interactive (with job control, without
+    prompts or line editing), so Stop behaves like Ctrl+C: it signals only the foreground job and
+    abandons the rest of the command line, and the session survives even a forced kill.
+    """
+
+    def __init__(self, name: str, shell: Optional[str] = None, cwd: Optional[str] = None):
+        self.name = name
+        self.shell = shell or shutil.which("bash") or "/bin/sh"
+        self.cwd = cwd or os.getcwd()
+        self.pid: Optional[int] = None
+        self.fd: Optional[int] = None
+        self.lock = threading.Lock()  # held while a command runs
+        self.commands = 0
+        self.restarts = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.pid is not None
+
+    def start(self):
+        env = dict(os.environ, **SESSION_ENV)
+        if os.path.basename(self.shell) == "bash":
+            args = [self.shell, "--noprofile", "--norc", "--noediting", "-i"]
+        else:
+            args = [self.shell, "-i"]
+        pid, fd = pty.fork()
+        if pid == 0:  # child
+            try:
+                os.chdir(self.cwd)
+                os.execvpe(self.shell, args, env)
+            finally:
+                os._exit(127)
+        self.pid, self.fd = pid, fd
+        os.write(fd, SESSION_SETUP)
+        if self._collect(self._sentinel(), None, 5.0) is None:
+            self.close()
+            raise RuntimeError(f"Shell session '{self.name}' did not start ({self.shell})")
+
+    def _sentinel(self) -> str:
+        """Write a sentinel request and return its marker (split in the input so an echo never matches)"""
+        token = uuid.uuid4().hex
+        os.write(self.fd, f"printf '\\n%s%s:%s:%s\\n' __PS {token} \"$?\" \"$PWD\"\n".encode())
+        return f"\n__PS{token}:"
+
+    def run(self, command: "SessionCommand") -> int:
+        """Run command in this session (the caller holds self.lock)"""
+        if not self.alive:
+            if self.commands:
+                self.restarts += 1
+            self.start()
+        self.commands += 1
+        os.write(self.fd, f"eval {shlex.quote(command.command)} </dev/null\n".encode())
+        status = self._collect(self._sentinel(), command, None)
+        if status is None:
+            return self.close()  # the command ran `exit`, or the shell itself was killed
+        code, cwd = status
+        self.cwd = cwd or self.cwd
+        return code
+
+    def _collect(self, marker: str, command: Optional["SessionCommand"], timeout: Optional[float]):
+        """Stream output until marker; returns (exit code, cwd), or None if the shell went away"""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            if deadline and time.monotonic() > deadline:
+                return None
+            ready, _, _ = select.select([self.fd], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError:  # EIO once the shell has exited
+                data = b""
+            if not data:
+                return None
+            pending += decoder.decode(data).replace("\r\n", "\n")
+            index = pending.find(marker)
+            if index >= 0:
+                end = pending.find("\n", index + len(marker))
+                if end < 0:
+                    continue  # the status line is still arriving
+                self._emit(command, pending[:index])
+                code, _, cwd = pending[index + len(marker):end].partition(":")
+                return int(code) if code.lstrip("-").isdigit() else -1, cwd
+            # Hold back enough to recognise a marker split across reads
+            safe = max(0, len(pending) - len(marker) - 1)
+            self._emit(command, pending[:safe])
+            pending = pending[safe:]
+
+    @staticmethod
+    def _emit(command: Optional["SessionCommand"], text: str):
+        if text and command is not None and command.on_output is not None:
+            command.on_output(ANSI_RE.sub("", text))
+
+    def interrupt(self):
+        """SIGINT to the terminal's foreground process group: the running job, not the shell"""
+        self._signal(signal.SIGINT)
+
+    def kill(self):
+        self._signal(signal.SIGKILL)
+
+    def _signal(self, sig):
+        try:
+            os.killpg(os.tcgetpgrp(self.fd), sig)
+        except (OSError, TypeError):
+            pass
+
+    def close(self) -> int:
+        """End the shell; returns its exit code"""
+        if self.pid is None:
+            return -1
+        code = -1
+        try:
+            pid, status = os.waitpid(self.pid, os.WNOHANG)
+            if pid == 0:
+                os.kill(self.pid, signal.SIGKILL)
+                _, status = os.waitpid(self.pid, 0)
+            code = os.waitstatus_to_exitcode(status)
+        except OSError:
+            pass
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+        self.pid = self.fd = None
+        return code
+
+
+class SessionCommand:
+    """One command for a ShellSession, with the same run()/stop() interface as CommandProcess.
+
+    If the session is busy with a longer command, this one runs as a separate process in the
+    session's current directory instead of waiting behind it.
+    """
+
+    def __init__(self, session: ShellSession, command: str, on_output: Optional[Callable[[str], None]] = None,
+                 timeout: float = 0.0, kill_after: float = 3.0):
+        self.session = session
+        self.command = command
+        self.on_output = on_output
+        self.timeout = timeout
+        self.kill_after = kill_after
+        self.returncode: Optional[int] = None
+        self.elapsed = 0.0
+        self.stopped = False
+        self.timed_out = False
+        self.fallback: Optional[CommandProcess] = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    def run(self) -> int:
+        start = time.monotonic()
+        if not self.session.lock.acquire(blocking=False):
+            with self._lock:
+                self.fallback = CommandProcess(self.command, self.session.cwd, self.on_output,
+                                               self.timeout, self.kill_after)
+                if self.stopped:
+                    return -1
+            self.returncode = self.fallback.run()
+            self.elapsed, self.timed_out = self.fallback.elapsed, self.fallback.timed_out
+            return self.returncode
+
+        timer = None
+        try:
+            with self._lock:
+                if self.stopped:
+                    return -1
+                self._running = True
+            if self.timeout:
+                timer = threading.Timer(self.timeout, self._expire)
+                timer.daemon = True
+                timer.start()
+            self.returncode = self.session.run(self)
+        finally:
+            self._running = False
+            self.session.lock.release()
+            if timer is not None:
+                timer.cancel()
+            self.elapsed = time.monotonic() - start
+        return self.returncode
+
+    def _expire(self):
+        self.timed_out = True
+        self.stop()
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+            if self.fallback is not None:
+                self.fallback.stop()
+                return
+            if not self._running:
+                return
+        self.session.interrupt()
+        killer = threading.Timer(self.kill_after, self._kill)
+        killer.daemon = True
+        killer.start()
+
+    def _kill(self):
+        if self._running:
+            self.session.kill()
+
+
+class ShellSessions:
+    """Named persistent shell sessions, created on first use"""
+
+    def __init__(self, shell: Optional[str] = None):
+        self.shell = shell
+        self.sessions: Dict[str, ShellSession] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def supported() -> bool:
+        return pty is not None
+
+    def get(self, name: str) -> ShellSession:
+        with self._lock:
+            if name not in self.sessions:
+                self.sessions[name] = ShellSession(name, self.shell)
+            return self.sessions[name]
+
+    def command(self, name: str, command: str, on_output: Optional[Callable[[str], None]] = None,
+                timeout: float = 0.0, kill_after: float = 3.0) -> SessionCommand:
+        return SessionCommand(self.get(name), command, on_output, timeout, kill_after)
+
+    def close(self, name: str):
+        with self._lock:
+            session = self.sessions.pop(name, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        for name in list(self.sessions):
+            self.close(name)
+
+    def stats(self) -> Dict[str, Any]:
+        metrics = {}
+        for name, session in list(self.sessions.items()):
+            metrics.update({
+                f"{name}.alive": session.alive,
+                f"{name}.commands": session.commands,
+                f"{name}.restarts": session.restarts,
+                f"{name}.cwd": session.cwd,
+            })
+        return metrics
@@ -0,0 +1,61 @@
+import time
+import asyncio
+import threading
+from typing import Callable, List
+
+
+class TokenBatcher:
+    """Coalesces streamed tokens so listeners are notified at most once per frame"""
+
+    def __init__(self, emit: Callable[[str], None], interval: float = 1 / 60):
+        self.emit = emit
+        self.interval = interval
+        self._buffer: List[str] = []
+        self._last_flush = 0.0
+        self._timer = None  # pending trailing flush (asyncio TimerHandle or threading.Timer)
+        self._lock = threading.Lock()
+
+    def add(self, token: str):
+        """Buffer a token; flush now if a frame interval has elapsed, else schedule the flush"""
+        if not token:
+            return
+        with self._lock:
+            self._buffer.append(token)
+            wait = self.interval - (time.monotonic() - self._last_flush)
+            if wait > 0:
+                # Without a trailing flush, a stream that pauses mid-frame would sit in the buffer
+                if self._timer is None:
+                    self._timer = self._schedule(wait)
+                return
+            text = self._drain()
+        self.emit(text)
+
+    def flush(self):
+        """Emit any buffered tokens immediately"""
+        with self._lock:
+            text = self._drain()
+        if text:
+            self.emit(text)
+
+    def _schedule(self, delay: float):
+        try:
+            return asyncio.get_running_loop().call_later(delay, self._on_timer)
+        except RuntimeError:
+            timer = threading.Timer(delay, self._on_timer)
+            timer.daemon = True
+            timer.start()
+            return timer
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def _drain(self) -> str:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        text = "".join(self._buffer)
+        self._buffer.clear()
+        self._last_flush = time.monotonic()
+        return text
@@ -0,0 +1,189 @@
+import time
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+# Lower runs first within a queue
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class TaskCancelled(Exception):
+    """Raised by CancellationToken.raise_if_cancelled inside a task that was asked to stop"""
+
+
+class CancellationToken:
+    """Cooperative cancellation flag shared between the submitter and a running task"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class _Task:
+    __slots__ = ("fn", "args", "kwargs", "future", "token", "queued_at")
+
+    def __init__(self, fn, args, kwargs, token):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.token = token
+        self.queued_at = time.monotonic()
+
+
+class _Queue:
+    """One named queue: a priority heap served by a fixed number of persistent worker threads"""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.max_workers = max(1, workers)
+        self.heap: List[tuple] = []  # (priority, seq, task)
+        self.threads: List[threading.Thread] = []
+        self.running: List[_Task] = []
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self.heap),
+            "running": len(self.running),
+            "workers": len(self.threads),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "wait_avg": self.wait_total / self.started if self.started else 0.0,
+            "wait_max": self.wait_max,
+            "run_avg": self.run_total / self.started if self.started else 0.0,
+        }
+
+
+class TaskExecutor:
+    """Shared, bounded background executor with named priority queues.
+
+    Each queue ("media", "exec", ...) gets its own persistent worker threads, created on first use and
+    reused for every later task, so a slow OCR job never holds up command execution. Tasks return
+    concurrent.futures.Future; queued tasks can be cancelled outright, running ones through their
+    CancellationToken.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.queues: Dict[str, _Queue] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Condition()
+        self._closed = False
+
+    def submit(self, queue: str, fn: Callable[..., Any], *args, priority: int = PRIORITY_NORMAL,
+               token: Optional[CancellationToken] = None, **kwargs) -> Future:
+        """Run fn(*args, **kwargs) on a worker of the named queue"""
+        task = _Task(fn, args, kwargs, token or CancellationToken())
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("TaskExecutor has been shut down")
+            q = self._queue(queue)
+            heapq.heappush(q.heap, (priority, next(self._seq), task))
+            if len(q.threads) < q.max_workers and len(q.heap) > self._idle(q):
+                thread = threading.Thread(target=self._work, args=(q,), name=f"promptshell-{queue}-{len(q.threads)}",
+                                          daemon=True)
+                q.threads.append(thread)
+                thread.start()
+            self._lock.notify_all()
+        return task.future
+
+    def _queue(self, name: str) -> _Queue:
+        if name not in self.queues:
+            self.queues[name] = _Queue(name, self.config.workers.get(name, self.config.default_workers))
+        return self.queues[name]
+
+    @staticmethod
+    def _idle(q: _Queue) -> int:
+        return len(q.threads) - len(q.running)
+
+    def _work(self, q: _Queue):
+        while True:
+            with self._lock:
+                while not q.heap and not self._closed:
+                    self._lock.wait()
+                if self._closed and not q.heap:
+                    return
+                _, _, task = heapq.heappop(q.heap)
+                if task.token.cancelled or not task.future.set_running_or_notify_cancel():
+                    q.cancelled += 1
+                    task.future.cancel()
+                    continue
+                waited = time.monotonic() - task.queued_at
+                q.wait_total += waited
+                q.wait_max = max(q.wait_max, waited)
+                q.started += 1
+                q.running.append(task)
+
+            start = time.monotonic()
+            try:
+                result = task.fn(*task.args, **task.kwargs)
+            except TaskCancelled as e:
+                outcome = "cancelled"
+                task.future.set_exception(e)
+            except BaseException as e:
+                outcome = "failed"
+                task.future.set_exception(e)
+            else:
+                outcome = "completed"
+                task.future.set_result(result)
+
+            with self._lock:
+                q.running.remove(task)
+                q.run_total += time.monotonic() - start
+                setattr(q, outcome, getattr(q, outcome) + 1)
+                self._lock.notify_all()
+
+    def cancel(self, queue: Optional[str] = None):
+        """Cancel queued tasks and signal running ones, in one queue or all of them"""
+        with self._lock:
+            for q in self.queues.values():
+                if queue is not None and q.name != queue:
+                    continue
+                for _, _, task in q.heap:
+                    task.token.cancel()
+                    if task.future.cancel():
+                        q.cancelled += 1
+                q.heap.clear()
+                for task in q.running:
+                    task.token.cancel()
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Cancel outstanding work and wait up to timeout seconds for running tasks to stop"""
+        self.cancel()
+        with self._lock:
+            self._closed = True
+            self._lock.notify_all()
+        deadline = time.monotonic() + (self.config.shutdown_timeout if timeout is None else timeout)
+        for q in list(self.queues.values()):
+            for thread in q.threads:
+                thread.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-queue depth, wait-time and throughput metrics as a flat mapping"""
+        with self._lock:
+            metrics = {}
+            for name, q in self.queues.items():
+                metrics.update({f"{name}.{k}": v for k, v in q.stats().items()})
+            return metrics
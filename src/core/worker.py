@@ -1,19 +1,190 @@
-from PySide6.QtCore import QObject, Signal, QThread
+import asyncio
+import itertools
+from collections import OrderedDict
+from PySide6.QtCore import QObject, Signal, Slot
 from src.core.llm_engine import LLMEngine
+from src.core.streaming import TokenBatcher
+from src.core.executor import CommandExecutor, CommandProcess, PlanRun
+from src.core.shell_session import ShellSessions
+from src.core.output_capture import OutputCapture
+from src.core.tasks import PRIORITY_HIGH
 
-class CommandWorker(QObject):
-    finished = Signal(object)
-    error = Signal(str)
-    
-    def __init__(self, user_input, llm_engine, task_type="command"):
-        super().__init__()
-        self.user_input = user_input
+class RequestDispatcher(QObject):
+    """Submits LLM queries to the engine's event loop and delivers results in submission order"""
+    finished = Signal(int, object)
+    error = Signal(int, str)
+    partial = Signal(int, str)  # batched streamed tokens
+    cancelled = Signal(int)
+    pending_changed = Signal(int)
+    notice = Signal(object, str, str)  # request id, kind, message (routing, token budget, ...)
+
+    # Internal hops from the event-loop thread to the GUI thread
+    _completed = Signal(int, object)
+    _partial_received = Signal(int, str)
+
+    def __init__(self, llm_engine: LLMEngine, parent=None):
+        super().__init__(parent)
         self.llm_engine = llm_engine
-        self.task_type = task_type
-        
-    def run(self):
-        try:
-            result = self.llm_engine.process_query(self.user_input, self.task_type)
-            self.finished.emit(result)
-        except Exception as e:
-            self.error.emit(str(e))
+        self._ids = itertools.count(1)
+        self._order = []       # request ids in submission order
+        self._outcomes = {}    # request id -> completed Future
+        self._partials = {}    # request id -> buffered chunks while not at the head
+
+        self.llm_engine.listener = self.notice.emit
+        self._completed.connect(self._on_completed)
+        self._partial_received.connect(self._on_partial)
+
+    def submit(self, user_input, task_type="command", timeout=None) -> int:
+        """Queue a query and return its request id"""
+        request_id = next(self._ids)
+        self._order.append(request_id)
+
+        batcher = TokenBatcher(lambda text: self._partial_received.emit(request_id, text))
+        future = self.llm_engine.submit(request_id, user_input, task_type, on_token=batcher.add, timeout=timeout)
+        future.add_done_callback(lambda f: (batcher.flush(), self._completed.emit(request_id, f)))
+
+        self.pending_changed.emit(len(self._order))
+        return request_id
+
+    def cancel(self, request_id) -> bool:
+        """Cancel a single in-flight request"""
+        return self.llm_engine.cancel(request_id)
+
+    def cancel_all(self):
+        """Cancel every request that has not been delivered yet"""
+        for request_id in list(self._order):
+            self.llm_engine.cancel(request_id)
+
+    def pending(self):
+        """Get ids of requests not yet delivered"""
+        return list(self._order)
+
+    @Slot(int, str)
+    def _on_partial(self, request_id, text):
+        if self._order and self._order[0] == request_id:
+            self.partial.emit(request_id, text)
+        else:
+            self._partials.setdefault(request_id, []).append(text)
+
+    @Slot(int, object)
+    def _on_completed(self, request_id, future):
+        self._outcomes[request_id] = future
+
+        # Deliver in submission order: release every finished request at the head
+        while self._order and self._order[0] in self._outcomes:
+            head = self._order.pop(0)
+            self._deliver(head, self._outcomes.pop(head))
+
+            if self._order and self._order[0] in self._partials:
+                next_head = self._order[0]
+                self.partial.emit(next_head, "".join(self._partials.pop(next_head)))
+
+        self.pending_changed.emit(len(self._order))
+
+    def _deliver(self, request_id, future):
+        self._partials.pop(request_id, None)
+        if future.cancelled():
+            self.cancelled.emit(request_id)
+            return
+
+        exc = future.exception()
+        if isinstance(exc, asyncio.TimeoutError):
+            self.error.emit(request_id, f"Request #{request_id} timed out")
+        elif exc is not None:
+            self.error.emit(request_id, str(exc))
+        else:
+            self.finished.emit(request_id, future.result())
+
+
+class CommandRunner(QObject):
+    """Runs shell commands on the "exec" task queue and streams their output to the GUI thread.
+
+    Commands go to a named persistent shell session when enabled and supported, else one process each.
+    A multi-step plan runs as one PlanRun, its steps as separate processes in the session's directory.
+    Output passes through an OutputCapture, so only the first display_chars reach the GUI.
+    """
+    started = Signal(int, str)       # run id, command
+    output = Signal(int, str)        # run id, text as it arrives
+    finished = Signal(int, object, object)  # run id, CommandProcess or PlanRun (returncode, elapsed, ...), OutputCapture
+    running_changed = Signal(int)
+
+    # Internal hops from worker threads to the GUI thread
+    _output = Signal(int, str)
+    _completed = Signal(int, object)
+
+    def __init__(self, tasks, config, parent=None):
+        super().__init__(parent)
+        self.tasks = tasks
+        self.config = config
+        self._ids = itertools.count(1)
+        self.executor = CommandExecutor()
+        self.processes = {}  # run id -> CommandProcess, SessionCommand or PlanRun
+        self.captures = OrderedDict()  # run id -> OutputCapture, oldest first; spill files kept for /more
+        self.sessions = ShellSessions(config.shell) if config.persistent_shell and ShellSessions.supported() else None
+        self._output.connect(self.output)
+        self._completed.connect(self._on_completed)
+
+    def run(self, command, session="default", plan=None) -> int:
+        """Start command (or the plan steps, if given) in the background and return its run id"""
+        run_id = next(self._ids)
+        capture = OutputCapture(self.config)
+        self.captures[run_id] = capture
+
+        def on_output(text):
+            shown = capture.feed(text)
+            if shown:
+                self._output.emit(run_id, shown)
+        if plan:
+            cwd = self.sessions.get(session).cwd if self.sessions is not None else None
+            process = PlanRun(plan, self.executor, cwd, on_output, self.config.plan_policy, self.config.plan_workers,
+                              self.config.plan_max_risk, self.config.timeout, self.config.kill_after)
+        elif self.sessions is not None:
+            process = self.sessions.command(session, command, on_output, self.config.timeout, self.config.kill_after)
+        else:
+            process = CommandProcess(command, None, on_output, self.config.timeout, self.config.kill_after)
+        self.processes[run_id] = process
+        future = self.tasks.submit("exec", process.run, priority=PRIORITY_HIGH)
+        future.add_done_callback(lambda f: self._completed.emit(run_id, f))
+        self.started.emit(run_id, command)
+        self.running_changed.emit(len(self.processes))
+        return run_id
+
+    def stop(self, run_id):
+        process = self.processes.get(run_id)
+        if process is not None:
+            process.stop()
+
+    def stop_all(self):
+        for process in list(self.processes.values()):
+            process.stop()
+
+    def close(self):
+        """Stop running commands, end every shell session and delete spilled output"""
+        self.stop_all()
+        if self.sessions is not None:
+            self.sessions.close_all()
+        for capture in self.captures.values():
+            capture.discard()
+        self.captures.clear()
+
+    @Slot(int, object)
+    def _on_completed(self, run_id, future):
+        process = self.processes.pop(run_id)
+        if future.cancelled():
+            process.stopped = True
+        elif future.exception() is not None:
+            self.output.emit(run_id, f"Execution error: {future.exception()}\n")
+            process.returncode = -1
+        capture = self.captures.get(run_id)
+        if capture is None:
+            # close() already discarded the output; the completion arrived during shutdown
+            self.running_changed.emit(len(self.processes))
+            return
+        capture.close()
+        self.finished.emit(run_id, process, capture)
+        self.running_changed.emit(len(self.processes))
+
+        # Keep the output of the last few finished commands browsable
+        finished = [rid for rid in self.captures if rid not in self.processes]
+        for rid in finished[:max(0, len(finished) - self.config.keep_outputs)]:
+            self.captures.pop(rid).discard()
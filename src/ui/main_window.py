@@ -1,6 +1,7 @@
 import sys
+import html
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QIcon
 from qfluentwidgets import (FluentWindow, NavigationItemPosition, FluentIcon as FIF, 
                             Theme, setTheme, SplashScreen, isDarkTheme)
@@ -8,7 +9,8 @@ from qfluentwidgets import (FluentWindow, NavigationItemPosition, FluentIcon as
 from src.ui.widgets.terminal import TerminalWidget
 from src.ui.widgets.history_view import HistoryWidget
 from src.ui.widgets.settings_page import SettingsPage
-from src.core.worker import CommandWorker
+from src.core.worker import RequestDispatcher, CommandRunner
+from src.core.tasks import TaskExecutor
 from src.ui.theme import ThemeManager
 from src.core.config import settings
 
@@ -24,12 +26,22 @@ class PromptShellWindow(FluentWindow):
         from src.core.executor import CommandExecutor
         from src.core.history import CommandHistory
         
-        self.llm_engine = LLMEngine()
+        # Provider clients are created on the engine thread so the window can paint immediately
+        self.llm_engine = LLMEngine(defer_initialize=True)
         self.executor = CommandExecutor()
         self.history = CommandHistory()
+        self.dispatcher = RequestDispatcher(self.llm_engine, self)
+        # One bounded pool for blocking work (media extraction, command execution); LLM calls use the engine loop
+        self.tasks = TaskExecutor(settings.config.tasks)
+        self.commands = CommandRunner(self.tasks, settings.config.execution, self)
+        self.command_results = {}  # run id -> CommandResponse being executed
+        self.active_session = "default"
+        self.last_capture = None  # OutputCapture of the last finished command, paged by /more
+        self.more_offset = 0
+        self.llm_engine.index_history(list(self.history.history))
         
         # UI Components
-        self.terminal_interface = TerminalWidget(self)
+        self.terminal_interface = TerminalWidget(self.tasks, self)
         self.terminal_interface.setObjectName("terminal_interface")
         
         self.history_interface = HistoryWidget(self.history, self)
@@ -41,6 +53,7 @@ class PromptShellWindow(FluentWindow):
         self.init_navigation()
         self.init_window()
         self.connect_signals()
+        self.llm_engine.warm_up()
         
     def init_navigation(self):
         self.addSubInterface(self.terminal_interface, FIF.COMMAND_PROMPT, "Terminal")
@@ -62,8 +75,25 @@ class PromptShellWindow(FluentWindow):
 
     def connect_signals(self):
         self.terminal_interface.command_submitted.connect(self.process_command)
+        self.terminal_interface.cancel_requested.connect(self.dispatcher.cancel_all)
+        self.terminal_interface.cancel_requested.connect(self.commands.stop_all)
+        self.terminal_interface.conversation_reset.connect(self.llm_engine.reset_memory)
+        self.terminal_interface.stats_requested.connect(self.show_stats)
+        self.terminal_interface.session_requested.connect(self.switch_session)
+        self.terminal_interface.more_requested.connect(self.show_more_output)
+        self.terminal_interface.prefetch_requested.connect(self.llm_engine.prefetcher.request)
+        self.dispatcher.finished.connect(self.on_command_generated)
+        self.dispatcher.error.connect(self.on_error)
+        self.dispatcher.cancelled.connect(self.on_cancelled)
+        self.dispatcher.partial.connect(lambda _, text: self.terminal_interface.append_stream_chunk(text))
+        self.dispatcher.pending_changed.connect(self.update_pending_count)
+        self.commands.running_changed.connect(self.update_pending_count)
+        self.commands.output.connect(lambda _, text: self.terminal_interface.append_command_output(text))
+        self.commands.finished.connect(self.on_command_finished)
+        self.dispatcher.notice.connect(self.on_notice)
         self.history_interface.command_selected.connect(self.on_history_command_selected)
         self.settings_interface.settings_saved.connect(self.on_settings_saved)
+        self.settings_interface.cache_clear_requested.connect(self.llm_engine.cache.clear)
         # self.settings_interface.theme_changed.connect(self.on_theme_changed) # FluentWindow handles theme mostly
 
     def on_history_command_selected(self, cmd):
@@ -71,34 +101,27 @@ class PromptShellWindow(FluentWindow):
         self.switchTo(self.terminal_interface)
 
     def on_settings_saved(self):
-        self.llm_engine.initialize()
+        self.llm_engine.initialize_async()
+        self.llm_engine.warm_up()
         self.switchTo(self.terminal_interface)
             
     def process_command(self, text, task_type="command"):
-        # 1. Generate Command via LLM (Threaded)
-        self.terminal_interface.append_output(f"Processing... ({task_type})")
+        # 1. Generate Command via LLM (on the engine's event loop)
+        if task_type == "command":
+            # Hand a matching speculation over before the input clears; otherwise cancel it
+            self.llm_engine.prefetcher.claim(text)
+        request_id = self.dispatcher.submit(text, task_type)
+        self.terminal_interface.append_output(f"Processing #{request_id}... ({task_type})")
         
-        # Create worker
-        self.worker = CommandWorker(text, self.llm_engine, task_type)
-        self.worker.finished.connect(self.on_command_generated)
-        self.worker.error.connect(self.on_error)
-        
-        self.thread = QThread()
-        self.worker.moveToThread(self.thread)
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-        
-        self.thread.start()
-        
-    def on_command_generated(self, result):
+    def on_command_generated(self, request_id, result):
         import json
         
+        self.terminal_interface.end_stream()
+        
         if isinstance(result, (dict, list)):
             # Analyst Mode: Render Table
-            html = self.format_html_table(result)
-            self.terminal_interface.display_analysis_result(result, html)
+            table_html = self.format_html_table(result)
+            self.terminal_interface.display_analysis_result(result, table_html)
             
             # Add to history
             self.history.add_entry("Analysis Task", "Data Table generated", success=True)
@@ -120,19 +143,86 @@ class PromptShellWindow(FluentWindow):
             self.terminal_interface.append_output(f"<br><span style='color: #4CC2FF;'><b>COMMAND:</b></span> {cmd}")
             self.terminal_interface.append_output(f"<span style='color: #909090;'><b>EXPLANATION:</b> {explanation}</span>")
             
+            if result.plan:
+                steps = "<br>".join(f"&nbsp;&nbsp;<b>{html.escape(step.id)}</b>"
+                                    f"{' (after ' + html.escape(', '.join(step.depends_on)) + ')' if step.depends_on else ''}: "
+                                    f"{html.escape(step.command)}" for step in result.plan)
+                self.terminal_interface.append_output(f"<span style='color: #909090;'><b>PLAN:</b><br>{steps}</span>")
+            
             if result.is_safe:
-                stdout, stderr = self.executor.execute(cmd)
-                if stdout:
-                    self.terminal_interface.append_output(stdout)
-                if stderr:
-                    self.terminal_interface.append_output(f"Error: {stderr}")
-                
-                self.history.add_entry(result.command_nlp, cmd, success=not bool(stderr))
-                self.history_interface.refresh_history()
+                run_id = self.commands.run(cmd, self.active_session, result.plan)
+                self.command_results[run_id] = result
             else:
                 self.terminal_interface.append_output("<br><span style='color: #FFCC00;'><b>[WARNING]</b> Command deemed unsafe. Please review and execute manually if sure.</span>")
                 # We could add an interactive approval here later
 
+    def on_command_finished(self, run_id, process, capture):
+        result = self.command_results.pop(run_id)
+        self.last_capture, self.more_offset = capture, capture.shown_bytes
+        if capture.binary:
+            where = f" saved to {html.escape(capture.path)}" if capture.path else ""
+            self.terminal_interface.append_output(f"<span style='color: #808080;'>[BINARY OUTPUT] {capture.size():,} bytes not shown{where}</span>")
+        elif capture.truncated:
+            hidden = capture.total - capture.shown
+            self.terminal_interface.append_command_output(f"\n[... {hidden:,} more characters; last part below, /more pages from the cut ...]\n")
+            self.terminal_interface.append_command_output(capture.tail())
+        self.terminal_interface.end_command_output()
+        if process.timed_out:
+            status, color = f"TIMED OUT after {process.elapsed:.1f}s", "#FF4C4C"
+        elif process.stopped:
+            status, color = f"STOPPED after {process.elapsed:.1f}s", "#FFCC00"
+        else:
+            status = f"EXIT {process.returncode} in {process.elapsed:.2f}s"
+            color = "#4CAF50" if process.returncode == 0 else "#FF4C4C"
+        self.terminal_interface.append_output(f"<span style='color: {color};'><b>[{status}]</b></span>")
+        for step in getattr(process, "results", []):
+            step_color = {"ok": "#4CAF50", "failed": "#FF4C4C", "blocked": "#FFCC00"}.get(step.status, "#808080")
+            code = f" exit {step.returncode}" if step.returncode is not None else ""
+            self.terminal_interface.append_output(
+                f"<span style='color: {step_color};'>&nbsp;&nbsp;{html.escape(step.id)}: {step.status.upper()}{code}"
+                f" (started +{step.started:.2f}s, {step.elapsed:.2f}s)</span>")
+        
+        self.history.add_entry(result.command_nlp, result.command_shell, success=process.returncode == 0)
+        self.history_interface.refresh_history()
+
+    def show_more_output(self):
+        capture = self.last_capture
+        if capture is None or not (capture.truncated or capture.binary):
+            self.terminal_interface.append_output("<span style='color: #808080;'>[MORE] No hidden output from the last command.</span>")
+            return
+        if capture.binary:
+            self.terminal_interface.append_output("<span style='color: #808080;'>[MORE] The last command's output is binary and is not shown.</span>")
+            return
+        text, self.more_offset = capture.read(self.more_offset, settings.config.execution.display_chars)
+        if not text:
+            self.terminal_interface.append_output("<span style='color: #808080;'>[MORE] End of output.</span>")
+            return
+        self.terminal_interface.append_command_output(text)
+        self.terminal_interface.end_command_output()
+
+    def switch_session(self, name):
+        sessions = self.commands.sessions
+        if sessions is None:
+            self.terminal_interface.append_output("<span style='color: #808080;'>[SESSION] Persistent shell sessions are off; each command runs in a fresh shell.</span>")
+            return
+        if name:
+            self.active_session = name
+        known = ", ".join(html.escape(s) for s in sorted(set(sessions.sessions) | {self.active_session}))
+        cwd = sessions.get(self.active_session).cwd
+        self.terminal_interface.append_output(f"<span style='color: #808080;'>[SESSION] Using '{html.escape(self.active_session)}' in {html.escape(cwd)} (sessions: {known})</span>")
+
+    def update_pending_count(self, _=None):
+        self.terminal_interface.set_pending_count(len(self.dispatcher.pending()) + len(self.commands.processes))
+
+    def show_stats(self):
+        metrics = self.llm_engine.stats()
+        metrics.update({f"tasks.{k}": v for k, v in self.tasks.stats().items()})
+        if self.commands.sessions is not None:
+            metrics.update({f"shell.{k}": v for k, v in self.commands.sessions.stats().items()})
+        stats = {k: f"{v:.2f}" if isinstance(v, float) else v for k, v in metrics.items()}
+        self.terminal_interface.append_output("<br><h3 style='color: #4CC2FF; font-family: Segoe UI, sans-serif;'>ENGINE METRICS</h3>")
+        self.terminal_interface.append_output(self.format_html_table(stats))
+
     def format_html_table(self, data):
         # Determine colors based on theme
         dark = isDarkTheme()
@@ -169,18 +259,23 @@ class PromptShellWindow(FluentWindow):
         import json
         return json.dumps(data, indent=2)
 
-    def on_error(self, err):
-        self.terminal_interface.on_processing_error(str(err))
+    def on_error(self, request_id, err):
+        self.terminal_interface.end_stream()
+        self.terminal_interface.append_output(f"<span style='color: #FF4C4C;'><b>[ERROR]</b> {err}</span>")
+
+    def on_notice(self, request_id, kind, message):
+        prefix = f"#{request_id} " if isinstance(request_id, int) else ""
+        self.terminal_interface.append_output(f"<span style='color: #808080;'>[{kind.upper()}] {prefix}{html.escape(message)}</span>")
+
+    def on_cancelled(self, request_id):
+        self.terminal_interface.end_stream()
+        self.terminal_interface.append_output(f"<span style='color: #FFCC00;'><b>[CANCELLED]</b> Request #{request_id}</span>")
 
     def closeEvent(self, event):
-        # Clean up threads
-        if hasattr(self, 'thread'):
-            try:
-                if self.thread.isRunning():
-                    self.thread.quit()
-                    self.thread.wait()
-            except RuntimeError:
-                pass
+        # Stop running commands, background tasks, the LLM event loop and any in-flight requests
+        self.commands.close()
+        self.tasks.shutdown()
+        self.llm_engine.runner.shutdown()
         super().closeEvent(event)
 
 def main():
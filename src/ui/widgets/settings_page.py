@@ -10,6 +10,7 @@ from src.core.config import settings
 class SettingsPage(ScrollArea):
     settings_saved = Signal()
     theme_changed = Signal(str)
+    cache_clear_requested = Signal()
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -55,7 +56,7 @@ class SettingsPage(ScrollArea):
         )
         
         self.provider_combo = ComboBox(self.provider_card)
-        self.provider_combo.addItems(["Groq", "OpenAI", "OpenRouter", "Gemini"])
+        self.provider_combo.addItems(["Groq", "OpenAI", "OpenRouter", "Gemini", "Local"])
         self.provider_combo.currentTextChanged.connect(self.on_provider_changed)
         
         # Add to card layout
@@ -113,6 +114,39 @@ class SettingsPage(ScrollArea):
         
         self.main_layout.addWidget(self.appearance_group)
         
+        # --- Performance ---
+        self.performance_group = SettingCardGroup("Performance", self)
+        
+        self.cache_card = SwitchSettingCard(
+            FIF.SPEED_HIGH,
+            "Response Cache",
+            "Reuse previous translations for repeated requests",
+            parent=self.performance_group
+        )
+        self.performance_group.addSettingCard(self.cache_card)
+        
+        self.prefetch_card = SwitchSettingCard(
+            FIF.SEND,
+            "Speculative Prefetch",
+            "Translate while you type so Enter shows the command instantly (uses extra API calls)",
+            parent=self.performance_group
+        )
+        self.performance_group.addSettingCard(self.prefetch_card)
+        
+        self.clear_cache_card = SettingCard(
+            FIF.BROOM,
+            "Clear Response Cache",
+            "Remove all cached translations",
+            parent=self.performance_group
+        )
+        self.clear_cache_btn = PushButton("Clear Cache", self.clear_cache_card, FIF.DELETE)
+        self.clear_cache_btn.clicked.connect(self.clear_cache)
+        self.clear_cache_card.hBoxLayout.addWidget(self.clear_cache_btn, 0, Qt.AlignRight)
+        self.clear_cache_card.hBoxLayout.addSpacing(16)
+        self.performance_group.addSettingCard(self.clear_cache_card)
+        
+        self.main_layout.addWidget(self.performance_group)
+        
         self.main_layout.addStretch()
         
         # --- Footer Actions ---
@@ -136,7 +170,8 @@ class SettingsPage(ScrollArea):
             "Groq": ["llama-3.3-70b-versatile", "llama-3.1-70b-versatile", "mixtral-8x7b-32768", "gemma2-9b-it"],
             "OpenAI": ["gpt-4-turbo", "gpt-4", "gpt-3.5-turbo", "gpt-4o"],
             "OpenRouter": ["openai/gpt-4-turbo", "anthropic/claude-3-opus", "meta-llama/llama-3-70b-instruct", "google/gemini-pro"],
-            "Gemini": ["gemini-pro", "gemini-pro-vision", "gemini-ultra"]
+            "Gemini": ["gemini-pro", "gemini-pro-vision", "gemini-ultra"],
+            "Local": ["stand-in"]
         }
         
         # Init with defaults if not loaded yet (will be overridden by load_settings immediately usually)
@@ -159,7 +194,7 @@ class SettingsPage(ScrollArea):
         config = settings.config.llm
         
         # Provider
-        provider_map = {"groq": "Groq", "openai": "OpenAI", "openrouter": "OpenRouter", "gemini": "Gemini"}
+        provider_map = {"groq": "Groq", "openai": "OpenAI", "openrouter": "OpenRouter", "gemini": "Gemini", "local": "Local"}
         text = provider_map.get(config.provider.lower(), "OpenRouter")
         self.provider_combo.setCurrentText(text)
         
@@ -182,6 +217,10 @@ class SettingsPage(ScrollArea):
         # Theme
         theme = settings.config.theme
         self.theme_card.setChecked(theme == "dark")
+        
+        # Cache
+        self.cache_card.setChecked(settings.config.cache.enabled)
+        self.prefetch_card.setChecked(settings.config.prefetch.enabled)
 
     def reset_to_defaults(self):
         self.provider_combo.setCurrentText("OpenRouter")
@@ -189,6 +228,12 @@ class SettingsPage(ScrollArea):
         self.model_combo.setCurrentIndex(0)
         self.api_key_input.clear()
         self.theme_card.setChecked(True)
+        self.cache_card.setChecked(True)
+        self.prefetch_card.setChecked(False)
+
+    def clear_cache(self):
+        self.cache_clear_requested.emit()
+        InfoBar.success(title='Cache Cleared', content="All cached responses were removed.", orient=Qt.Horizontal, isClosable=True, position=InfoBarPosition.BOTTOM_RIGHT, duration=2000, parent=self)
 
     def save_settings(self):
         provider = self.provider_combo.currentText().lower()
@@ -202,6 +247,8 @@ class SettingsPage(ScrollArea):
             
         settings.update_llm_config(provider, model, api_key)
         settings.set_theme(theme)
+        settings.set_cache_enabled(self.cache_card.isChecked())
+        settings.set_prefetch_enabled(self.prefetch_card.isChecked())
         
         InfoBar.success(title='Success', content="Settings saved successfully!", orient=Qt.Horizontal, isClosable=True, position=InfoBarPosition.BOTTOM_RIGHT, duration=2000, parent=self)
         self.settings_saved.emit()
@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QFileDialog, QLabel, 
                                QStackedWidget, QMenu, QFrame)
 from PySide6.QtGui import QTextCursor, QAction, QColor, QPalette
-from PySide6.QtCore import Qt, Signal, QSize, QThread, QPoint
+from PySide6.QtCore import Qt, Signal, QSize, QPoint, QTimer
 from qfluentwidgets import (TextEdit, LineEdit, PrimaryPushButton, PushButton, 
                             FluentIcon as FIF, ToolButton, InfoBar, InfoBarPosition,
                             TitleLabel, StrongBodyLabel, ImageLabel, CaptionLabel,
@@ -11,6 +11,11 @@ import json
 import csv
 import html
 from src.core.media_processor import MediaProcessorWorker
+from src.core.tasks import CancellationToken
+from src.core.retrieval import DocumentIndex
+from src.core.prompts import Prompt, ANALYST_SYSTEM_PROMPT, DEVELOPER_SYSTEM_PROMPT
+from src.core.risk import classify
+from src.core.config import settings
 
 class WelcomeWidget(QWidget):
     def __init__(self, parent=None):
@@ -97,15 +102,28 @@ class FileContextBar(QFrame):
         self.update_style() # Refresh style in case theme changed (simple approach)
 
 class TerminalWidget(QWidget):
-    command_submitted = Signal(str, str)
+    command_submitted = Signal(object, str)  # query (str or Prompt), task type
+    cancel_requested = Signal()
+    stats_requested = Signal()
+    prefetch_requested = Signal(str)  # input text after a typing pause
+    conversation_reset = Signal()  # Clear also starts a new conversation
+    session_requested = Signal(str)  # "/session [name]": show or switch the shell session
+    more_requested = Signal()  # "/more": page through output that was cut from the display
     
-    def __init__(self, parent=None):
+    def __init__(self, tasks, parent=None):
         super().__init__(parent)
         self.setObjectName("terminal_widget")
+        self.tasks = tasks  # shared TaskExecutor
+        self.worker = None
+        self.media_token = None
         self.active_context = ""
         self.active_file_type = None
         self.active_file_paths = []
+        self.active_documents = []  # (file name, extracted text) per processed file
+        self.context_index = None
         self.last_analysis_data = None
+        self.stream_start = None  # document position of the live streaming preview
+        self.command_block_open = False  # command output is being appended to the current block
         
         self.init_ui()
         
@@ -158,6 +176,18 @@ class TerminalWidget(QWidget):
         self.input_field.setPlaceholderText("Enter command...")
         self.input_field.setMinimumHeight(36)
         self.input_field.returnPressed.connect(self.submit_command)
+        self.input_field.textEdited.connect(self.on_input_edited)
+        # Re-checked on every change (typing or a command recalled from history); classify() is cached
+        self.input_field.textChanged.connect(self.update_risk_hint)
+        
+        # Risk of the line being edited, shown only when it is not safe
+        self.risk_label = CaptionLabel("", self)
+        self.risk_label.setVisible(False)
+        
+        # Speculative prefetch fires once typing pauses
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.timeout.connect(self.request_prefetch)
         
         # Run Button
         self.run_btn = PrimaryPushButton("Run", self)
@@ -165,6 +195,13 @@ class TerminalWidget(QWidget):
         self.run_btn.clicked.connect(self.submit_command)
         self.run_btn.setMinimumHeight(36)
         
+        # Stop Button (cancels in-flight requests)
+        self.stop_btn = PushButton("Stop", self)
+        self.stop_btn.setIcon(FIF.CANCEL)
+        self.stop_btn.setEnabled(False)
+        self.stop_btn.clicked.connect(self.cancel_requested.emit)
+        self.stop_btn.setMinimumHeight(36)
+        
         # Clear Button
         self.clear_btn = PushButton("Clear", self)
         self.clear_btn.setIcon(FIF.DELETE)
@@ -175,8 +212,10 @@ class TerminalWidget(QWidget):
         input_layout.addWidget(self.export_btn) # Added export button
         input_layout.addWidget(self.input_field, 1) 
         input_layout.addWidget(self.run_btn)
+        input_layout.addWidget(self.stop_btn)
         input_layout.addWidget(self.clear_btn)
         
+        layout.addWidget(self.risk_label)
         layout.addLayout(input_layout)
         
         # Set default view
@@ -249,8 +288,14 @@ class TerminalWidget(QWidget):
             except Exception as e:
                 InfoBar.error(title='Error', content=str(e), parent=self)
         
+    def set_pending_count(self, count):
+        self.stop_btn.setEnabled(count > 0)
+        self.stop_btn.setToolTip(f"Stop {count} pending request(s) or running command(s)" if count else "")
+        
     def clear_terminal(self):
         self.output_area.clear()
+        self.conversation_reset.emit()
+        self.stream_start = None
         self.output_stack.setCurrentIndex(0) # Show welcome
         self.clear_file_context()
         self.last_analysis_data = None
@@ -273,6 +318,8 @@ class TerminalWidget(QWidget):
         
         self.processing_queue = list(file_paths)
         self.active_context = "" # Reset context
+        self.active_documents = []
+        self.context_index = None
         self.process_next_file()
 
     def process_next_file(self):
@@ -281,35 +328,21 @@ class TerminalWidget(QWidget):
             return
             
         file_path = self.processing_queue.pop(0)
+        self.current_file_path = file_path
         
-        # Ensure previous thread is cleaned up
-        if hasattr(self, 'processing_thread') and self.processing_thread is not None:
-             try:
-                 if self.processing_thread.isRunning():
-                     self.processing_thread.quit()
-                     self.processing_thread.wait()
-             except RuntimeError:
-                 # Thread already deleted
-                 pass
-        
-        self.processing_thread = QThread()
-        self.worker = MediaProcessorWorker(file_path)
-        self.worker.moveToThread(self.processing_thread)
-        
-        self.processing_thread.started.connect(self.worker.run)
+        # Runs on the shared "media" queue; signals arrive back on the GUI thread
+        self.media_token = CancellationToken()
+        self.worker = MediaProcessorWorker(file_path, self.media_token)
         self.worker.finished.connect(self.on_single_file_processed)
         self.worker.error.connect(self.on_processing_error)
         self.worker.progress.connect(self.on_processing_progress)
-        self.worker.finished.connect(self.processing_thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.processing_thread.finished.connect(self.processing_thread.deleteLater)
-        
-        self.processing_thread.start()
+        self.tasks.submit("media", self.worker.run, token=self.media_token)
 
     def on_single_file_processed(self, content, file_type):
         if self.active_context:
              self.active_context += "\n\n--- Next File ---\n\n"
         self.active_context += content
+        self.active_documents.append((os.path.basename(self.current_file_path), content))
         self.active_file_type = file_type 
         self.process_next_file()
 
@@ -329,6 +362,11 @@ class TerminalWidget(QWidget):
         self.file_context_bar.setVisible(True)
         self.input_field.setFocus()
         
+        # Index large uploads once so each question only sends the relevant chunks
+        retrieval = settings.config.retrieval
+        if retrieval.enabled and len(self.active_context) > retrieval.min_context_chars:
+            self.context_index = DocumentIndex.build(self.active_documents, retrieval.chunk_size, retrieval.chunk_overlap)
+        
         # Professional system message
         self.append_output(f"<span style='color: #4CC2FF;'><b>[SYSTEM]</b></span> Analyzed {count} files. Total context length: {len(self.active_context)} chars.")
         
@@ -358,10 +396,45 @@ class TerminalWidget(QWidget):
         self.active_context = ""
         self.active_file_type = None
         self.active_file_paths = []
+        self.active_documents = []
+        self.context_index = None
         self.file_context_bar.setVisible(False)
 
+    def on_input_edited(self, text):
+        if settings.config.prefetch.enabled and not self.active_context:
+            self.prefetch_timer.start(settings.config.prefetch.debounce_ms)
+        
+    def update_risk_hint(self, text):
+        verdict = classify(text.strip())
+        if verdict.level == "safe":
+            self.risk_label.setVisible(False)
+            return
+        color = "#FF4C4C" if verdict.level == "dangerous" else "#FFCC00"
+        self.risk_label.setStyleSheet(f"color: {color};")
+        self.risk_label.setText(f"{verdict.level.upper()}: {verdict.reason}")
+        self.risk_label.setVisible(True)
+        
+    def request_prefetch(self):
+        text = self.input_field.text().strip()
+        if not self.active_context:
+            # An empty or slash-command line still goes out so a stale speculation gets cancelled
+            self.prefetch_requested.emit("" if text.startswith("/") else text)
+            
     def submit_command(self):
+        self.prefetch_timer.stop()
         text = self.input_field.text().strip()
+        if text == "/stats":
+            self.input_field.clear()
+            self.stats_requested.emit()
+            return
+        if text == "/session" or text.startswith("/session "):
+            self.input_field.clear()
+            self.session_requested.emit(text[len("/session"):].strip())
+            return
+        if text == "/more":
+            self.input_field.clear()
+            self.more_requested.emit()
+            return
         if text:
             # Ensure output view is shown
             self.output_stack.setCurrentIndex(1)
@@ -373,24 +446,31 @@ class TerminalWidget(QWidget):
                 
             if self.active_context:
                 display_text = f"[With File Context] {text}"
-                system_prompt_add = ""
+                system_prompt = ""
                 if self.active_file_type in ['pdf', 'image']:
-                    system_prompt_add = (
-                        "You are an expert Data Analyst. "
-                        "Your task is to extract information from the provided context based on the user's request. "
-                        "Return the result ONLY as a valid JSON object. "
-                        "If the requested information is not found, return null values in the JSON. "
-                        "Do not include any conversational text, markdown formatting, or explanations outside the JSON."
-                    )
+                    system_prompt = ANALYST_SYSTEM_PROMPT
                     task_type = "analyst"
                 elif self.active_file_type == 'video':
-                    system_prompt_add = "You are an expert Senior Developer."
+                    system_prompt = DEVELOPER_SYSTEM_PROMPT
                     task_type = "developer"
                 
-                full_query = f"{system_prompt_add}\n\nContext Content:\n{self.active_context}\n\nUser Question: {text}"
+                context = self.active_context
+                citations = ""
+                if self.context_index is not None:
+                    chunks = self.context_index.select(text, settings.config.retrieval.top_k)
+                    context = DocumentIndex.format_context(chunks)
+                    citations = ", ".join(chunk.citation for chunk in chunks)
+                
+                if system_prompt:
+                    # Separate messages keep the system prompt and context as a stable, cacheable prefix
+                    full_query = Prompt(system_prompt, text, context)
+                else:
+                    full_query = f"\n\nContext Content:\n{context}\n\nUser Question: {text}"
                 
                 safe_text = html.escape(text)
                 self.append_output(f"<span style='color: #CCCCCC;'>&gt; [CONTEXT] {safe_text}</span>")
+                if citations:
+                    self.append_output(f"<span style='color: #808080;'>[INFO] Using {len(chunks)} of {len(self.context_index.chunks)} chunks: {html.escape(citations)}</span>")
                 self.command_submitted.emit(full_query, task_type)
             else:
                 safe_text = html.escape(text)
@@ -412,6 +492,55 @@ class TerminalWidget(QWidget):
         
         self.output_area.moveCursor(QTextCursor.MoveOperation.End)
 
+    def append_stream_chunk(self, text):
+        """Append partial LLM output to a live preview block"""
+        if self.output_stack.currentIndex() != 1:
+             self.output_stack.setCurrentIndex(1)
+        
+        cursor = self.output_area.textCursor()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        if self.stream_start is None:
+            cursor.insertBlock()
+            self.stream_start = cursor.position()
+        cursor.insertText(text)
+        
+        self.output_area.moveCursor(QTextCursor.MoveOperation.End)
+
+    def append_command_output(self, text):
+        """Append live output of a running command as plain text"""
+        if self.output_stack.currentIndex() != 1:
+             self.output_stack.setCurrentIndex(1)
+        
+        # Keep an LLM preview that is streaming at the same time last, so end_stream only removes the preview
+        cursor = QTextCursor(self.output_area.document())
+        if self.stream_start is None:
+            cursor.movePosition(QTextCursor.MoveOperation.End)
+        else:
+            cursor.setPosition(self.stream_start - 1)
+        before = cursor.position()
+        if not self.command_block_open:
+            cursor.insertBlock()
+            self.command_block_open = True
+        cursor.insertText(text)
+        if self.stream_start is not None:
+            self.stream_start += cursor.position() - before
+        
+        self.output_area.moveCursor(QTextCursor.MoveOperation.End)
+
+    def end_command_output(self):
+        self.command_block_open = False
+
+    def end_stream(self):
+        """Remove the live preview so the formatted final result replaces it"""
+        if self.stream_start is None:
+            return
+        
+        cursor = QTextCursor(self.output_area.document())
+        cursor.setPosition(self.stream_start - 1)
+        cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        self.stream_start = None
+
     def display_analysis_result(self, raw_data, html_content=None):
         self.last_analysis_data = raw_data
         self.export_btn.setEnabled(True)